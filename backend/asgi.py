@@ -2,6 +2,12 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is how the project is served: ``gunicorn`` from the repository root
+runs it in uvicorn workers (see gunicorn.conf.py), or ``uvicorn
+backend.asgi:application`` for a single process. The async login and
+signup views then wait on the password hashing pool without holding a
+worker thread, and the task event stream (tasks/events/) holds no thread
+at all while it waits for events.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
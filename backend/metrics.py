@@ -0,0 +1,288 @@
+"""
+Request metrics in the Prometheus text format.
+
+MetricsMiddleware records into the process-wide ``registry``. With
+METRICS_DIR set (shared by every gunicorn worker), a background thread in
+each worker writes a snapshot of its registry to
+``<METRICS_DIR>/<process uuid>.json`` every METRICS_FLUSH_INTERVAL seconds,
+and ``/metrics`` adds up the snapshots of all workers, so whichever worker
+serves the scrape reports the whole server. Snapshots not rewritten for
+METRICS_SNAPSHOT_TTL seconds belong to workers that have exited and are
+deleted; Prometheus sees that as a counter reset.
+
+``/metrics`` is only served to scrapers presenting METRICS_TOKEN, and
+not at all while it is unset.
+"""
+
+import atexit
+import hmac
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    "http_requests_total": (
+        "counter",
+        "Requests served, sampled or not",
+        ("view", "method", "status"),
+        None,
+    ),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time spent handling sampled requests",
+        ("view", "method"),
+        DURATION_BUCKETS,
+    ),
+    "http_request_db_queries": (
+        "histogram",
+        "Database queries run by sampled requests",
+        ("view",),
+        QUERY_COUNT_BUCKETS,
+    ),
+    "http_request_db_duration_seconds": (
+        "histogram",
+        "Time spent in database queries by sampled requests",
+        ("view",),
+        DURATION_BUCKETS,
+    ),
+    "http_response_size_bytes": (
+        "histogram",
+        "Body size of sampled, non-streaming responses",
+        ("view",),
+        SIZE_BUCKETS,
+    ),
+}
+
+
+class Registry:
+    """Counters and histograms for this process, keyed by (name, label values)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.pid = None
+        self.process_id = None
+        self.flusher_pid = None
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][3]
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                # Per-bucket counts, then +Inf, then the sum
+                histogram = self.histograms[(name, labels)] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(buckets)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [
+                    [name, list(labels), list(values)]
+                    for (name, labels), values in self.histograms.items()
+                ],
+            }
+
+    def snapshot_path(self):
+        """
+        This process's snapshot file. Named by a UUID drawn per process
+        rather than the pid, which the OS may hand to a later worker.
+        """
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.process_id = uuid.uuid4().hex
+        return Path(settings.METRICS_DIR) / f"{self.process_id}.json"
+
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR"""
+        if not settings.METRICS_DIR:
+            return
+        path = self.snapshot_path()
+        tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    def start_flusher(self):
+        """Start this process's flush thread, unless it is running or METRICS_DIR is unset"""
+        if not settings.METRICS_DIR or self.flusher_pid == os.getpid():
+            return
+        with self.lock:
+            # Threads do not survive a fork, so each worker starts its own
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+        threading.Thread(target=self.run_flusher, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def run_flusher(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Writing the metrics snapshot failed")
+
+
+registry = Registry()
+
+
+def collect():
+    """Snapshots of every worker (just this process without METRICS_DIR)"""
+    if not settings.METRICS_DIR:
+        return [registry.snapshot()]
+
+    registry.flush()
+    expired = time.time() - settings.METRICS_SNAPSHOT_TTL
+    snapshots = []
+    for path in Path(settings.METRICS_DIR).glob("*.json"):
+        try:
+            if path.stat().st_mtime < expired:
+                path.unlink()
+                continue
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # Being replaced, or a worker died mid-write
+    return snapshots
+
+
+def merge(snapshots):
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            counters[(name, tuple(labels))] += value
+        for name, labels, values in snapshot["histograms"]:
+            key = (name, tuple(labels))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+            else:
+                histograms[key] = list(values)
+    return counters, histograms
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(counters, histograms):
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(label_names, labels)} {format_value(value)}")
+            continue
+
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, math.inf], values):
+                cumulative += count
+                le = format_labels(label_names, labels, [("le", format_value(bound))])
+                lines.append(f"{name}_bucket{le} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(label_names, labels)} {format_value(values[-1])}")
+            lines.append(f"{name}_count{format_labels(label_names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for bearers of METRICS_TOKEN only"""
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404()
+    authorization = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(
+        render(*merge(collect())), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+# Stats of the sampled request being handled; sync_to_async copies context
+# into its threads, so queries run there are counted too
+current_request = ContextVar("current_request", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - start
+
+
+def install_query_counter(connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter)
+
+
+def install_on_open_connections():
+    """For connections opened before this module was imported"""
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(connection)
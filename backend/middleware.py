@@ -1,30 +1,108 @@
 # middleware.py
-import sys
-from django.urls import resolve
-from django.urls.exceptions import Resolver404
+import random
+import time
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import RequestStats, current_request, install_on_open_connections, registry
+
+
+class MetricsMiddleware:
+    """
+    Records request metrics for /metrics (see backend/metrics.py).
+
+    Every request is counted. A METRICS_SAMPLE_RATE share of them also has
+    its latency, database queries and response size recorded per view.
+    """
+
+    sync_capable = True
+    async_capable = True
 
-class DebugMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        install_on_open_connections()
 
     def __call__(self, request):
-        print(f"Request path: {request.path}", file=sys.stderr, flush=True)
-        print(f"Request method: {request.method}", file=sys.stderr, flush=True)
-        print(f"Content-Type: {request.content_type}", file=sys.stderr, flush=True)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = self.stop(sample)
+        self.record(request, response, stats)
+        return response
 
-        # Test URL resolution
+    async def __acall__(self, request):
+        sample = self.start()
         try:
-            resolved = resolve(request.path)
-            print(
-                f"URL resolved to: {resolved.func} in {resolved.app_name}",
-                file=sys.stderr,
-                flush=True,
-            )
-            print(f"View name: {resolved.view_name}", file=sys.stderr, flush=True)
-        except Resolver404:
-            print("URL NOT FOUND - Resolver404 error", file=sys.stderr, flush=True)
-
-        response = self.get_response(request)
-        print(f"Response status: {response.status_code}", file=sys.stderr, flush=True)
+            response = await self.get_response(request)
+        finally:
+            stats = self.stop(sample)
+        self.record(request, response, stats)
         return response
+
+    def start(self):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return None
+        stats = RequestStats()
+        return stats, current_request.set(stats), time.perf_counter()
+
+    def stop(self, sample):
+        if sample is None:
+            return None
+        stats, token, started = sample
+        current_request.reset(token)
+        return stats, time.perf_counter() - started
+
+    def record(self, request, response, sample):
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unresolved"
+        registry.inc("http_requests_total", (view, request.method, str(response.status_code)))
+
+        if sample is not None:
+            stats, duration = sample
+            registry.observe("http_request_duration_seconds", (view, request.method), duration)
+            registry.observe("http_request_db_queries", (view,), stats.queries)
+            registry.observe("http_request_db_duration_seconds", (view,), stats.query_time)
+            if not response.streaming:
+                registry.observe("http_response_size_bytes", (view,), len(response.content))
+        registry.start_flusher()
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also run in an async middleware chain.
+
+    WhiteNoise is sync-only, so under ASGI Django would run it and every
+    async view below it on the single thread-sensitive worker thread: a
+    view awaiting the password hash pool would then hold up all other
+    requests. Here only static file lookups and responses leave the event
+    loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -45,10 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    "backend.middleware.DebugMiddleware",
+    "backend.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "backend.middleware.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     # "django.middleware.csrf.CsrfViewMiddleware",
@@ -89,6 +89,19 @@ WSGI_APPLICATION = "backend.wsgi.application"
 
 DATABASES = {"default": dj_database_url.parse(os.getenv("DATABASE_URL"))}
 
+# Shared by every worker when REDIS_URL is set (needs the redis package);
+# otherwise each process has its own in-memory cache, which
+# AUTH_TOKEN_USER_MODE refuses to run with (see backend/user/checks.py)
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -134,10 +147,13 @@ if not DEBUG:
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Benchmarks (tests tagged "benchmark") only run with --tag=benchmark
+TEST_RUNNER = "backend.test_runner.TestRunner"
+
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "backend.user.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -153,6 +169,22 @@ REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "rest_framework.views.exception_handler",
 }
 
+# Task list pagination (keyset on created_at, id)
+TASK_PAGE_SIZE = 50
+TASK_MAX_PAGE_SIZE = 200
+
+# Maximum number of tasks accepted by one bulk create request
+TASK_BULK_CREATE_LIMIT = 500
+
+# Maximum number of tasks moved by one bulk status request
+TASK_BULK_UPDATE_LIMIT = 500
+
+# Tasks marked overdue per transaction by the overdue sweeper
+OVERDUE_SWEEP_CHUNK_SIZE = 500
+
+# Rows fetched per database round-trip when streaming full task dumps
+TASK_STREAM_CHUNK_SIZE = 2000
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=3),
@@ -213,4 +245,81 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
-DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
\ No newline at end of file
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
+
+# Email outbox delivery (manage.py send_outbox_emails)
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 60
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+
+# In-process scheduler (manage.py run_scheduler), intervals in seconds
+SCHEDULER_JITTER_SECONDS = 5
+SCHEDULER_OVERDUE_MAX_INTERVAL = 300
+SCHEDULER_OVERDUE_MAX_ROWS = 5000
+SCHEDULER_TOKEN_CLEANUP_INTERVAL = 6 * 60 * 60
+SCHEDULER_TOMBSTONE_CLEANUP_INTERVAL = 24 * 60 * 60
+SCHEDULER_OUTBOX_INTERVAL = 15
+
+# Derive "overdue" from the deadline at read time instead of rewriting
+# task rows when deadlines pass (Task.save() flip and overdue sweep)
+TASK_COMPUTED_OVERDUE = False
+
+# Change feed (tasks/changes/): tasks and removals per page, and how long
+# tombstones of removed tasks are kept; older cursors must resync in full
+TASK_CHANGES_PAGE_SIZE = 500
+TASK_TOMBSTONE_RETENTION_DAYS = 30
+
+# Task search (tasks/search/): default and largest number of results
+TASK_SEARCH_LIMIT = 20
+TASK_SEARCH_MAX_LIMIT = 100
+
+# Server-sent task events (tasks/events/, ASGI only): events buffered per
+# stream before a slow client is told to resync, seconds between
+# heartbeats and before a stream is closed, the reconnect delay sent to
+# clients, and how often writes from other processes are relayed
+SSE_QUEUE_SIZE = 100
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_STREAM_SECONDS = 60 * 60
+SSE_RETRY_MILLISECONDS = 3000
+SSE_RELAY_INTERVAL = 2
+
+# Per-process cache of authenticated users (0 disables it), TTL in seconds
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+
+# Let permission checks trust the role claims in access tokens, loading the
+# user only when a view needs it (see backend/user/tokens.py for the policy
+# applied when a role changes before a token expires). Needs a shared CACHES
+# backend, e.g. REDIS_URL.
+AUTH_TOKEN_USER_MODE = False
+
+# In-process bloom filter of blacklisted refresh tokens; refresh in seconds,
+# which is also how long a token blacklisted by another worker may still be
+# refreshed on this one
+AUTH_BLACKLIST_FILTER_CAPACITY = 100000
+AUTH_BLACKLIST_FILTER_ERROR_RATE = 0.001
+AUTH_BLACKLIST_FILTER_REFRESH = 5
+
+# Expired outstanding/blacklisted tokens deleted per transaction
+TOKEN_PURGE_BATCH_SIZE = 1000
+
+# Threads that hash and check passwords for the async login/signup views
+# (half the CPUs by default, never more than all of them, so bcrypt cannot
+# starve other requests), and how many calls may wait for one before
+# requests get a 429
+PASSWORD_HASH_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+PASSWORD_HASH_QUEUE_DEPTH = 32
+
+# Request metrics served at /metrics. Share of requests whose latency,
+# queries and response size are recorded; a directory shared by all
+# gunicorn workers to aggregate across them (unset: this process only),
+# how often each worker writes its snapshot there and after how many
+# seconds without a write a snapshot counts as an exited worker's, in
+# seconds. Scrapers must send "Authorization: Bearer <METRICS_TOKEN>";
+# without METRICS_TOKEN the endpoint answers 404.
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "1.0"))
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = 5
+METRICS_SNAPSHOT_TTL = 300
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
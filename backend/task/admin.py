@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Task
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from .models import OutboxEmail, Task
+from .search import search_tasks
+
+User = get_user_model()
 
 
 @admin.register(Task)
@@ -32,6 +37,22 @@ class TaskAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match titles and descriptions through the full-text index and
+        assignees by any word of their username, instead of ILIKE scans over
+        the tasks table
+        """
+        words = search_term.split()
+        if not words:
+            return queryset, False
+        matches = search_tasks(Task.objects.all(), search_term).values("pk")
+        usernames = Q()
+        for word in words:
+            usernames |= Q(username__icontains=word)
+        assignees = User.objects.filter(usernames).values("pk")
+        return queryset.filter(Q(pk__in=matches) | Q(assigned_to__in=assignees)), False
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
@@ -57,3 +78,11 @@ class TaskAdmin(admin.ModelAdmin):
         if request.user.is_admin:
             return obj is None
         return False
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ["subject", "recipient", "status", "attempts", "next_attempt_at", "sent_at"]
+    list_filter = ["status"]
+    search_fields = ["subject", "recipient"]
+    readonly_fields = ["created_at", "sent_at", "last_error"]
@@ -0,0 +1,372 @@
+"""
+Async versions of the task read endpoints, for ASGI deployments.
+
+They authenticate through the JWT classes' ``aauthenticate`` and read
+through Django's async ORM, so a request waiting on the database or on a
+slow client holds no worker thread. Each view is routed with
+``async_reads``: GET and HEAD are answered here, every other method by
+the DRF view for the same URL.
+
+The collection endpoints answer conditional GETs: their ETag comes from
+one aggregate over the caller's tasks (see
+TaskQuerySet.version_expressions), so a client that already has the
+current version gets a 304 before anything is serialized.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, ValidationError
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .changes import parse_since, read_changes
+from .events import OVERFLOW, hub
+from .models import Task, TaskCounter
+from .pagination import TaskCursorPagination
+from .relay import relay, sequence_head
+from .search import search_tasks
+from .serializers import TaskRowSerializer, TaskSerializer
+from . import views
+from .views import filter_by_status, team_member_data, team_member_rows
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    """A JSON response rendered like DRF's JSONRenderer"""
+    return JsonResponse(
+        data,
+        status=status,
+        headers=headers,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+    )
+
+
+async def authenticate(request):
+    """
+    The user for ``request`` from the first authentication class that has
+    ``aauthenticate``, or None. Honours APIClient.force_authenticate in
+    tests, as DRF's Request does.
+    """
+    forced = getattr(request, "_force_auth_user", None)
+    if forced is not None:
+        return forced
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authenticator = authentication_class()
+        if not hasattr(authenticator, "aauthenticate"):
+            continue
+        result = await authenticator.aauthenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+def async_reads(sync_view, permission=None):
+    """
+    Serve GET and HEAD with the decorated async view and everything else
+    with ``sync_view`` (405 if None). The async view gets a DRF Request whose user has
+    been authenticated and has passed ``permission(user)``.
+    """
+
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ["GET", "HEAD"]:
+                if sync_view is None:
+                    return json_response(
+                        {"detail": f'Method "{request.method}" not allowed.'},
+                        status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                        headers={"Allow": "GET, HEAD"},
+                    )
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+            try:
+                user = await authenticate(request)
+                if user is None:
+                    raise NotAuthenticated()
+                if permission is not None and not permission(user):
+                    return json_response(
+                        {"detail": "You do not have permission to perform this action."},
+                        status=status.HTTP_403_FORBIDDEN,
+                    )
+
+                drf_request = Request(request)
+                drf_request.user = user
+                return await view(drf_request, *args, **kwargs)
+            except APIException as e:
+                headers = None
+                if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                    headers = {"WWW-Authenticate": 'Bearer realm="api"'}
+                detail = e.detail if isinstance(e.detail, (dict, list)) else {"detail": e.detail}
+                return json_response(detail, status=e.status_code, headers=headers)
+
+        return wrapper
+
+    return decorator
+
+
+async def etag_for(request, tasks, per_minute=False):
+    """
+    A weak ETag for a response built from ``tasks``, also covering the
+    caller and the query string (filters, cursor). Task rows carry
+    ``time_remaining``, which changes by the minute, so ``per_minute``
+    ETags also change with the current minute.
+
+    There is deliberately no Last-Modified: it has whole-second precision
+    and the latest ``updated_at`` says nothing about deleted tasks, so it
+    would answer 304 for collections that did change.
+    """
+    version = await tasks.aversion()
+    key = [
+        request.path,
+        request.META.get("QUERY_STRING", ""),
+        request.user.id,
+        request.user.role,
+        *(version[name] for name in sorted(version)),
+    ]
+    if per_minute:
+        key.append(timezone.now().replace(second=0, microsecond=0))
+    etag = hashlib.md5(repr(key).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{etag}"'
+
+
+async def conditional(request, tasks, render, per_minute=False):
+    """
+    A 304 if the client's If-None-Match still matches ``tasks``, else
+    ``await render()``; either way with the ETag set.
+    """
+    etag = await etag_for(request, tasks, per_minute)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await render()
+    response["ETag"] = etag
+    # Let browsers keep the body but revalidate before every use
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+async def paginated_rows(request, tasks):
+    paginator = TaskCursorPagination()
+    page = await paginator.apaginate_queryset(TaskRowSerializer.values(tasks), request)
+    return json_response(paginator.get_paginated_data(TaskRowSerializer(page).data))
+
+
+def visible_tasks(user):
+    """The tasks ``user`` may list: admins all, managers those they created, members their own"""
+    tasks = Task.objects.all()
+    if user.role == "manager":
+        return tasks.filter(created_by=user.id)
+    if user.role != "admin":
+        return tasks.filter(assigned_to=user.id)
+    return tasks
+
+
+@async_reads(views.TaskCreateView.as_view())
+async def task_list(request):
+    """
+    List tasks (admins see all, managers those they created, members those
+    assigned to them). Supports ?status=<status>; POST is TaskCreateView.
+    """
+    tasks = filter_by_status(request, visible_tasks(request.user))
+    return await conditional(request, tasks, lambda: paginated_rows(request, tasks), per_minute=True)
+
+
+@async_reads(None)
+async def task_search(request):
+    """
+    Tasks matching ?q=<words>, best match first, from the full-text index
+    (see backend/task/search.py). ?limit= caps the results.
+    """
+    text = request.query_params.get("q", "").strip()
+    if not text:
+        raise ValidationError({"q": ["This field is required."]})
+    try:
+        limit = int(request.query_params.get("limit", settings.TASK_SEARCH_LIMIT))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValidationError({"limit": ["Must be a positive integer."]})
+
+    tasks = search_tasks(filter_by_status(request, visible_tasks(request.user)), text)
+    limit = min(limit, settings.TASK_SEARCH_MAX_LIMIT)
+    rows = [row async for row in TaskRowSerializer.values(tasks)[:limit]]
+    return json_response({"results": TaskRowSerializer(rows).data})
+
+
+@async_reads(None)
+async def task_changes(request):
+    """Tasks changed and removed since ?since=<cursor>; see backend/task/changes.py"""
+    since = parse_since(request.query_params.get("since"))
+    return json_response(await read_changes(request.user, since))
+
+
+def sse(event, data, id=None):
+    """One server-sent event"""
+    lines = [f"id: {id}"] if id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@async_reads(None)
+async def task_events(request):
+    """
+    Server-sent events for task writes the user can see; see
+    backend/task/events.py. Starts with a "ready" event holding the current
+    cursor, sends a comment every SSE_HEARTBEAT_SECONDS to keep proxies
+    from closing an idle stream, and ends after SSE_MAX_STREAM_SECONDS so
+    that clients reconnect and authenticate again. A client too slow to
+    keep up gets "resync" and is disconnected; it should catch up from
+    tasks/changes/ and reconnect.
+
+    Only served under ASGI: a WSGI server would buffer the whole stream
+    and hold a worker for it, so there clients get a 501 and should poll
+    tasks/changes/ instead.
+    """
+    if not isinstance(request._request, ASGIRequest):
+        return json_response(
+            {"detail": "Task events need an ASGI server; poll tasks/changes/ instead."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    subscriber = hub.subscribe(request.user)
+    relay.ensure_running()
+    head = await sequence_head()
+
+    async def stream():
+        try:
+            yield f"retry: {settings.SSE_RETRY_MILLISECONDS}\n\n" + sse("ready", {"cursor": head})
+            loop = asyncio.get_running_loop()
+            closes_at = loop.time() + settings.SSE_MAX_STREAM_SECONDS
+            while (remaining := closes_at - loop.time()) > 0:
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.queue.get(), min(settings.SSE_HEARTBEAT_SECONDS, remaining)
+                    )
+                except TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is OVERFLOW:
+                    yield sse("resync", {})
+                    return
+                yield sse(event["type"], event, id=event["cursor"])
+        finally:
+            hub.unsubscribe(subscriber)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Don't let nginx buffer the stream
+    return response
+
+
+@async_reads(views.TaskUpdateDestroyView.as_view())
+async def task_detail(request, pk):
+    """
+    Retrieve a task (members only those assigned to them); PUT, PATCH and
+    DELETE are TaskUpdateDestroyView.
+    """
+    tasks = Task.objects.with_users()
+    if request.user.role not in ["admin", "manager"]:
+        tasks = tasks.filter(assigned_to=request.user.id)
+
+    task = await tasks.filter(pk=pk).afirst()
+    if task is None:
+        return json_response(
+            {"detail": "No Task matches the given query."}, status=status.HTTP_404_NOT_FOUND
+        )
+    return json_response(TaskSerializer(task).data)
+
+
+@async_reads(None)
+async def my_tasks(request):
+    """
+    Tasks assigned to the current user (members only)
+    Supports ?status=<status> on every task list
+    """
+    if request.user.role in ["admin", "manager"]:
+        return json_response(
+            {"detail": "This endpoint is for regular users only."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    tasks = filter_by_status(request, Task.objects.filter(assigned_to=request.user.id))
+    return await conditional(request, tasks, lambda: paginated_rows(request, tasks), per_minute=True)
+
+
+@async_reads(None)
+async def task_statistics(request):
+    """Task counts per status over the tasks the user may list"""
+    user = request.user
+    if user.is_admin:
+        scope, tasks = ("all", None), Task.objects.all()
+    elif user.role == "manager":
+        scope, tasks = ("created", user.id), Task.objects.filter(created_by=user.id)
+    else:
+        scope, tasks = ("assigned", user.id), Task.objects.filter(assigned_to=user.id)
+
+    async def render():
+        return json_response(await TaskCounter.objects.astatistics(*scope))
+
+    return await conditional(request, tasks, render)
+
+
+@async_reads(None)
+async def team_members(request):
+    """
+    Members the current manager has assigned tasks to, with their task
+    statistics (managers only). Supports ?ordering=<column> (e.g.
+    -overdue_tasks) and ?limit=&offset= paging.
+    """
+    if request.user.role != "manager":
+        return json_response(
+            {"detail": "This endpoint is for managers only."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    ordering = request.query_params.get("ordering", "username")
+    query = team_member_rows(request.user.id, ordering)
+    if query is None:
+        return json_response(
+            {"detail": f"Cannot order team members by '{ordering}'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    rows, count_columns = query
+
+    try:
+        paginator = LimitOffsetPagination()
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        if paginator.limit is None:
+            return json_response([team_member_data(row, count_columns) async for row in rows])
+
+        paginator.offset = paginator.get_offset(request)
+        paginator.count = await rows.acount()
+        page = rows[paginator.offset : paginator.offset + paginator.limit]
+        return json_response(
+            {
+                "count": paginator.count,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+                "results": [team_member_data(row, count_columns) async for row in page],
+            }
+        )
+    except Exception:
+        logger.exception("Listing team members failed")
+        return json_response(
+            {"detail": "An error occurred while fetching team members."},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
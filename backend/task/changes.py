@@ -0,0 +1,112 @@
+"""
+Change feed for clients that keep a local copy of their tasks.
+
+Every task write stores a change sequence number (TaskSequence.stamp)
+in Task.change_seq. Deletes, and reassignments away from an assignee, leave
+a TaskTombstone with their own number. A client keeps the ``cursor`` of
+its last response and asks for everything after it, so a refresh costs
+in proportion to what changed rather than to the size of the task list.
+"""
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Task, TaskSequence, TaskTombstone
+from .serializers import TaskRowSerializer
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "This cursor is older than the retained change history; fetch all tasks again."
+    default_code = "cursor_expired"
+
+
+def parse_since(value):
+    """The ``since`` query parameter as a cursor, or None for a full sync"""
+    if value in (None, ""):
+        return None
+    try:
+        since = int(value)
+    except ValueError:
+        since = -1
+    if since < 0:
+        raise ValidationError({"since": [f"'{value}' is not a valid cursor."]})
+    return since
+
+
+def scoped(user):
+    """The tasks and tombstones ``user`` follows, as in the task list"""
+    tasks = Task.objects.all()
+    tombstones = TaskTombstone.objects.all()
+    if user.role == "manager":
+        tasks = tasks.filter(created_by=user.id)
+        tombstones = tombstones.filter(created_by_id=user.id)
+    elif user.role != "admin":
+        tasks = tasks.filter(assigned_to=user.id)
+        tombstones = tombstones.filter(assigned_to_id=user.id)
+    return tasks, tombstones
+
+
+async def read_changes(user, since=None, limit=None):
+    """
+    Tasks written and task ids removed from ``user``'s scope after cursor
+    ``since`` (everything when None), oldest first, as a dict with the
+    next ``cursor`` and whether there is ``more`` to fetch.
+
+    Pages end on a sequence number rather than a row count, so rows
+    written together are never split; a page holds about ``limit`` tasks
+    and ``limit`` removals. Removed ids exclude tasks that are back in
+    scope, e.g. reassigned away and back.
+
+    Derived fields (is_overdue, time_remaining and, with
+    TASK_COMPUTED_OVERDUE, an effective "overdue" status) change with the
+    clock, not through writes, so they are not reported as changes.
+    """
+    limit = limit or settings.TASK_CHANGES_PAGE_SIZE
+    sequence = await TaskSequence.objects.horizon().afirst()
+    head, purged_upto = (sequence["head"], sequence["purged_upto"]) if sequence else (0, 0)
+    if since is not None and since < purged_upto:
+        raise CursorExpired()
+    if since is not None and since > head:
+        raise ValidationError({"since": [f"'{since}' is not a valid cursor."]})
+
+    # Every write numbered up to ``head`` has finished (see TaskSequence.horizon)
+    visible, tombstones = scoped(user)
+    tasks = visible.filter(change_seq__lte=head)
+    if since is None:
+        tombstones = None
+    else:
+        tasks = tasks.filter(change_seq__gt=since)
+        tombstones = tombstones.filter(change_seq__gt=since, change_seq__lte=head)
+
+    upto = head
+    for queryset in (tasks, tombstones):
+        if queryset is None:
+            continue
+        last = (
+            await queryset.order_by("change_seq")
+            .values_list("change_seq", flat=True)[limit - 1 : limit]
+            .afirst()
+        )
+        if last is not None:
+            upto = min(upto, last)
+
+    rows = TaskRowSerializer.values(tasks.filter(change_seq__lte=upto)).order_by("change_seq", "id")
+    removed = []
+    if tombstones is not None:
+        removed = [
+            task_id
+            async for task_id in tombstones.filter(change_seq__lte=upto)
+            .exclude(task_id__in=visible.values("id"))
+            .order_by("task_id")
+            .values_list("task_id", flat=True)
+            .distinct()
+        ]
+
+    return {
+        "cursor": upto,
+        "more": upto < head,
+        "changed": TaskRowSerializer([row async for row in rows]).data,
+        "removed": removed,
+    }
@@ -0,0 +1,189 @@
+"""
+In-process broadcast of task events to server-sent event streams.
+
+Task writes publish events through ``hub`` once their transaction
+commits. Each open stream subscribes with the key of the tasks it may see
+(the scopes of async_views.visible_tasks) and gets events through
+its own bounded queue; a stream that falls behind is told to resync and
+closed rather than buffering without limit. Writes made by other
+processes reach this process's streams through the relay
+(backend/task/relay.py).
+
+Every event carries the change sequence number of its write as
+``cursor``, so a client can fetch the details from tasks/changes/.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+# Queued in place of the event that did not fit; ends the stream
+OVERFLOW = object()
+
+
+def event_kind(previous, state):
+    """Event type for a write from ``previous`` to ``state``, both counted states"""
+    if previous is None:
+        return "created"
+    if previous[0] != state[0]:
+        return "reassigned"
+    if previous[2] != state[2]:
+        return "status"
+    return "updated"
+
+
+def task_event(kind, task_id, state, cursor, previous=None):
+    """An event for task ``task_id`` whose counted state is now ``state``"""
+    assigned_to, created_by, status = state
+    event = {
+        "type": kind,
+        "task": task_id,
+        "status": status,
+        "assigned_to": assigned_to,
+        "created_by": created_by,
+        "cursor": cursor,
+    }
+    if kind == "reassigned":
+        event["previous_assigned_to"] = previous[0]
+    return event
+
+
+def subscription_key(user):
+    if user.role == "admin":
+        return ("all",)
+    if user.role == "manager":
+        return ("created", user.id)
+    return ("assigned", user.id)
+
+
+def event_keys(event):
+    keys = [("all",), ("assigned", event["assigned_to"])]
+    if event["created_by"] is not None:
+        keys.append(("created", event["created_by"]))
+    if "previous_assigned_to" in event:
+        keys.append(("assigned", event["previous_assigned_to"]))
+    return keys
+
+
+class Subscriber:
+    """One stream's queue, read on the event loop that created it"""
+
+    def __init__(self, key, limit):
+        self.key = key
+        self.limit = limit
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue ``event``; runs on ``self.loop``"""
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.limit:
+            self.overflowed = True
+            self.queue.put_nowait(OVERFLOW)
+            return
+        self.queue.put_nowait(event)
+
+
+class Hub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        # Sequence numbers of committed writes published here, which the
+        # relay must not repeat, and those the relay published, which a late
+        # commit callback must not repeat
+        self.claimed = set()
+        self.relayed = set()
+
+    @property
+    def active(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, user):
+        subscriber = Subscriber(subscription_key(user), settings.SSE_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers[subscriber.key].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(subscriber.key)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.key]
+            if not self.subscribers:
+                self.claimed.clear()
+                self.relayed.clear()
+
+    def publish(self, events):
+        """Deliver ``events`` to every subscriber allowed to see them; thread-safe"""
+        deliveries = []
+        with self.lock:
+            for event in events:
+                targets = set()
+                for key in event_keys(event):
+                    targets.update(self.subscribers.get(key, ()))
+                deliveries.extend((subscriber, event) for subscriber in targets)
+        self.deliver(deliveries)
+
+    def broadcast(self, event):
+        """Deliver ``event`` to every subscriber"""
+        with self.lock:
+            deliveries = [
+                (subscriber, event)
+                for subscribers in self.subscribers.values()
+                for subscriber in subscribers
+            ]
+        self.deliver(deliveries)
+
+    def deliver(self, deliveries):
+        for subscriber, event in deliveries:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                self.unsubscribe(subscriber)  # Its event loop has closed
+
+    def publish_on_commit(self, events, using=None):
+        """Publish ``events`` once the current transaction commits"""
+        if events and self.active:
+            transaction.on_commit(lambda: self.publish_committed(events), using=using)
+
+    def publish_committed(self, events):
+        """
+        Publish the events of a committed write and claim their sequence
+        numbers. Claiming only after commit means a rolled-back write leaves
+        no claim behind to hide a later write from the relay. The relay may
+        see the commit before this runs; events it already published are
+        dropped.
+        """
+        with self.lock:
+            events = [event for event in events if event["cursor"] not in self.relayed]
+            self.claimed.update(event["cursor"] for event in events)
+        self.publish(events)
+
+    def claims(self, upto):
+        """Sequence numbers up to ``upto`` published by this process"""
+        with self.lock:
+            return {seq for seq in self.claimed if seq <= upto}
+
+    def publish_relayed(self, events, since, upto):
+        """
+        Publish the relay's events for the writes numbered after ``since``
+        up to ``upto``, except those claimed here in the meantime.
+        """
+        with self.lock:
+            events = [event for event in events if event["cursor"] not in self.claimed]
+            self.claimed = {seq for seq in self.claimed if seq > upto}
+            # Kept for one more range, for commit callbacks still running
+            self.relayed = {seq for seq in self.relayed if seq > since}
+            self.relayed.update(event["cursor"] for event in events)
+        self.publish(events)
+
+
+hub = Hub()
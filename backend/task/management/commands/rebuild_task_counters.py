@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend.task.models import TaskCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user task counters from the tasks table, or verify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the counters with the tasks table; exit non-zero on drift",
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatches = TaskCounter.objects.mismatches()
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS("Task counters are consistent."))
+                return
+
+            for (user_id, scope, status), stored, expected in mismatches:
+                user = f"user {user_id}" if user_id is not None else "all users"
+                self.stdout.write(
+                    f"  - {user} / {scope} / {status}: stored {stored}, expected {expected}"
+                )
+            raise CommandError(f"{len(mismatches)} task counters are out of date.")
+
+        rebuilt = TaskCounter.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} task counters"))
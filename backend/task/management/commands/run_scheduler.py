@@ -0,0 +1,46 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+from backend.task.scheduler import Scheduler, default_jobs
+
+
+class Command(BaseCommand):
+    help = "Run periodic maintenance jobs (overdue sweep, token cleanup, outbox) in one process"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every job once and exit",
+        )
+
+    def handle(self, *args, **options):
+        handler = logging.StreamHandler(self.stdout)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger = logging.getLogger("backend.task.scheduler")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO if options["verbosity"] >= 1 else logging.WARNING)
+
+        scheduler = Scheduler(default_jobs())
+        if options["once"]:
+            scheduler.run_pending()
+        else:
+            signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+            self.stdout.write(
+                "Scheduler running jobs: "
+                + ", ".join(job.name for job in scheduler.jobs)
+            )
+            try:
+                scheduler.run_forever()
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write("Job statistics:")
+        for job in scheduler.jobs:
+            stats = job.stats
+            average = stats["total_duration"] / stats["runs"] if stats["runs"] else 0
+            self.stdout.write(
+                f"  - {job.name}: {stats['runs']} runs, {stats['failures']} failed, "
+                f"{stats['skipped']} skipped, avg {average:.3f}s, max {stats['max_duration']:.3f}s"
+            )
@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.task.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notification emails from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help="Emails sent per connection",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=settings.OUTBOX_MAX_ATTEMPTS,
+            help="Failed attempts before an email is marked dead",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling the outbox when it is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep between polls of an empty outbox (with --loop)",
+        )
+
+    def handle(self, *args, **options):
+        totals = {"sent": 0, "retried": 0, "dead": 0}
+
+        while True:
+            results = deliver_batch(options["batch_size"], options["max_attempts"])
+            for key, count in results.items():
+                totals[key] += count
+
+            if any(results.values()):
+                self.stdout.write(
+                    f"Sent {results['sent']}, retrying {results['retried']}, "
+                    f"dead {results['dead']}"
+                )
+                # Keep draining while the batch was full
+                if sum(results.values()) >= options["batch_size"]:
+                    continue
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox drained: {totals['sent']} sent, {totals['retried']} retrying, "
+                f"{totals['dead']} dead"
+            )
+        )
@@ -1,30 +1,58 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from task.models import Task
+from backend.task.sweeper import sweep_overdue
 
 
 class Command(BaseCommand):
     help = "Update tasks that are past their deadline to overdue status"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the tasks that would be updated without changing them",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=None,
+            help="Update at most this many tasks in this run",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.OVERDUE_SWEEP_CHUNK_SIZE,
+            help="Tasks updated per transaction",
+        )
+
     def handle(self, *args, **options):
         # Find tasks that are past deadline and not completed
-        overdue_tasks = Task.objects.filter(
-            deadline__lt=timezone.now(), status__in=["pending", "in_progress"]
+        tasks, has_more = sweep_overdue(
+            chunk_size=options["chunk_size"],
+            max_rows=options["max_rows"],
+            dry_run=options["dry_run"],
         )
 
-        updated_count = overdue_tasks.update(status="overdue")
-
+        verb = "Would update" if options["dry_run"] else "Successfully updated"
         self.stdout.write(
-            self.style.SUCCESS(
-                f"Successfully updated {updated_count} tasks to overdue status"
-            )
+            self.style.SUCCESS(f"{verb} {len(tasks)} tasks to overdue status")
         )
 
-        if updated_count > 0:
-            self.stdout.write("Updated tasks:")
-            for task in overdue_tasks:
+        if tasks:
+            self.stdout.write(
+                "Tasks that would be updated:" if options["dry_run"] else "Updated tasks:"
+            )
+            for task in tasks:
                 self.stdout.write(
-                    f"  - {task.title} (assigned to {task.assigned_to.username})"
+                    f"  - {task['title']} (assigned to {task['assigned_to']}, "
+                    f"was {task['previous_status']})"
                 )
         else:
             self.stdout.write("No tasks needed to be updated.")
+
+        if has_more:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Row budget reached; more overdue tasks remain for the next run."
+                )
+            )
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    Task = apps.get_model("task", "Task")
+    TaskCounter = apps.get_model("task", "TaskCounter")
+    tasks = Task.objects.order_by()
+    counters = [
+        TaskCounter(user_id=None, scope="all", status=row["status"], count=row["n"])
+        for row in tasks.values("status").annotate(n=models.Count("id"))
+    ]
+    counters += [
+        TaskCounter(user_id=row["assigned_to"], scope="assigned", status=row["status"], count=row["n"])
+        for row in tasks.values("assigned_to", "status").annotate(n=models.Count("id"))
+    ]
+    counters += [
+        TaskCounter(user_id=row["created_by"], scope="created", status=row["status"], count=row["n"])
+        for row in tasks.filter(created_by__isnull=False)
+        .values("created_by", "status")
+        .annotate(n=models.Count("id"))
+    ]
+    TaskCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0003_task_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'All tasks'), ('assigned', 'Assigned to user'), ('created', 'Created by user')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('overdue', 'Overdue')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'scope', 'status'), name='task_counter_unique'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('scope', 'status'), name='task_counter_global_unique')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_existing_tasks(apps, schema_editor):
+    # Give existing tasks distinct numbers so a full sync pages through them
+    Task = apps.get_model("task", "Task")
+    TaskSequence = apps.get_model("task", "TaskSequence")
+    Task.objects.update(change_seq=models.F("id"))
+    last = Task.objects.aggregate(last=models.Max("id"))["last"] or 0
+    TaskSequence.objects.create(pk=1, value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0006_task_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('purged_upto', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('assigned_to_id', models.BigIntegerField()),
+                ('created_by_id', models.BigIntegerField(null=True)),
+                ('change_seq', models.BigIntegerField()),
+                ('removed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_tasks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'change_seq'], name='task_assignee_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'change_seq'], name='task_creator_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['change_seq'], name='task_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['assigned_to_id', 'change_seq'], name='tombstone_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['created_by_id', 'change_seq'], name='tombstone_creator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['change_seq'], name='tombstone_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['removed_at'], name='tombstone_removed_at_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+POSTGRESQL = [
+    """
+    ALTER TABLE task_task ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX task_search_vector_idx ON task_task USING gin (search_vector)",
+]
+
+SQLITE = [
+    """
+    CREATE VIRTUAL TABLE task_task_fts USING fts5(
+        title, description, content='task_task', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER task_task_fts_insert AFTER INSERT ON task_task BEGIN
+        INSERT INTO task_task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER task_task_fts_delete AFTER DELETE ON task_task BEGIN
+        INSERT INTO task_task_fts (task_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER task_task_fts_update AFTER UPDATE OF title, description ON task_task BEGIN
+        INSERT INTO task_task_fts (task_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO task_task_fts (task_task_fts) VALUES ('rebuild')",
+]
+
+REVERSE = {
+    "postgresql": [
+        "DROP INDEX task_search_vector_idx",
+        "ALTER TABLE task_task DROP COLUMN search_vector",
+    ],
+    "sqlite": [
+        "DROP TRIGGER task_task_fts_insert",
+        "DROP TRIGGER task_task_fts_delete",
+        "DROP TRIGGER task_task_fts_update",
+        "DROP TABLE task_task_fts",
+    ],
+}
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return apply
+
+
+class Migration(migrations.Migration):
+    """Full-text index over task titles and descriptions (see backend/task/search.py)"""
+
+    dependencies = [
+        ("task", "0007_task_change_feed"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"postgresql": POSTGRESQL, "sqlite": SQLITE}),
+            run(REVERSE),
+        ),
+    ]
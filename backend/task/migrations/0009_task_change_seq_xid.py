@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def switch_to_transaction_ids(apps, schema_editor):
+    # On PostgreSQL change sequence numbers become transaction ids. Numbers
+    # from the old counter are kept as long as they sort before every new
+    # one; cursors handed out so far, and the tombstones behind them, are
+    # retired so clients resync once.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+        current = cursor.fetchone()[0]
+        cursor.execute(
+            "UPDATE task_task SET change_seq = %s WHERE change_seq >= %s", [current - 1, current]
+        )
+        cursor.execute("DELETE FROM task_tasktombstone")
+        cursor.execute(
+            "UPDATE task_tasksequence SET purged_upto = %s WHERE id = 1", [current - 1]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("task", "0008_task_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(switch_to_transaction_ids, migrations.RunPython.noop),
+    ]
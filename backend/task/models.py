@@ -1,9 +1,207 @@
-from django.db import models
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models.expressions import RawSQL
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from .events import event_kind, hub, task_event
+
 User = get_user_model()
 
+# Task columns that TaskCounter rows are keyed on
+COUNTED_FIELDS = ("assigned_to", "created_by", "status")
+
+# Statuses a task can still go overdue from
+OPEN_STATUSES = ["pending", "in_progress"]
+
+
+def status_q(status, now=None):
+    """
+    Q matching tasks whose effective status is ``status``.
+
+    With TASK_COMPUTED_OVERDUE an open task past its deadline is overdue
+    whatever its stored status says; otherwise the stored status is used.
+    """
+    if not settings.TASK_COMPUTED_OVERDUE:
+        return models.Q(status=status)
+
+    now = now or timezone.now()
+    if status == "overdue":
+        return models.Q(status="overdue") | models.Q(
+            status__in=OPEN_STATUSES, deadline__lt=now
+        )
+    if status in OPEN_STATUSES:
+        return models.Q(status=status, deadline__gte=now)
+    return models.Q(status=status)
+
+
+class TaskQuerySet(models.QuerySet):
+    def with_users(self):
+        """
+        Join the assignee and creator in the same query, loading only the
+        user columns that TaskSerializer reads.
+        """
+        task_fields = [f.name for f in self.model._meta.concrete_fields]
+        return self.select_related("assigned_to", "created_by").only(
+            *task_fields,
+            "assigned_to__username",
+            "assigned_to__first_name",
+            "assigned_to__last_name",
+            "created_by__username",
+            "created_by__first_name",
+            "created_by__last_name",
+        )
+
+    def with_effective_status(self, now=None):
+        """Annotate ``effective_status``, the status reported to clients"""
+        if not settings.TASK_COMPUTED_OVERDUE:
+            return self.annotate(effective_status=models.F("status"))
+        return self.annotate(
+            effective_status=models.Case(
+                models.When(status_q("overdue", now), then=models.Value("overdue")),
+                default=models.F("status"),
+                output_field=models.CharField(),
+            )
+        )
+
+    def filter_status(self, statuses, now=None):
+        """Tasks whose effective status is one of ``statuses``"""
+        now = now or timezone.now()
+        condition = models.Q(pk__in=[])
+        for status in statuses:
+            condition |= status_q(status, now)
+        return self.filter(condition)
+
+    def status_count_expressions(self, now=None):
+        """
+        Conditional COUNT expressions for the total and for every status in
+        Task.STATUS_CHOICES, keyed as ``total_tasks`` and ``<status>_tasks``.
+        """
+        now = now or timezone.now()
+        expressions = {"total_tasks": models.Count("id")}
+        for value, _ in self.model.STATUS_CHOICES:
+            expressions[f"{value}_tasks"] = models.Count(
+                "id", filter=status_q(value, now)
+            )
+        return expressions
+
+    def version_expressions(self, now=None):
+        """
+        Aggregates that change whenever the serialized collection does: the
+        latest ``updated_at`` catches edits and inserts (renaming a user
+        bumps their tasks too, see signals.py), the row count catches
+        deletes and reassignments away. With TASK_COMPUTED_OVERDUE the number
+        of overdue tasks is added, since tasks go overdue without a write.
+        """
+        expressions = {"updated": models.Max("updated_at"), "count": models.Count("id")}
+        if settings.TASK_COMPUTED_OVERDUE:
+            expressions["overdue"] = models.Count("id", filter=status_q("overdue", now))
+        return expressions
+
+    async def aversion(self):
+        """version_expressions() for this queryset, in one aggregate query"""
+        return await self.order_by().aaggregate(**self.version_expressions())
+
+    def status_counts(self):
+        """Total and per-status task counts in a single aggregate query"""
+        return self.aggregate(**self.status_count_expressions())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Bulk insert tasks and bump their counters in the same transaction"""
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = list(objs)
+            change_seq = TaskSequence.objects.using(self.db).stamp()
+            for obj in objs:
+                obj.change_seq = change_seq
+            objs = super().bulk_create(objs, *args, **kwargs)
+            deltas = Counter()
+            for obj in objs:
+                for key in Task.counter_keys(*obj.counted_state):
+                    deltas[key] += 1
+                obj._counted_state = obj.counted_state
+            TaskCounter.objects.apply(deltas)
+            if hub.active:
+                hub.publish_on_commit(
+                    [task_event("created", obj.pk, obj.counted_state, change_seq) for obj in objs],
+                    using=self.db,
+                )
+        return objs
+
+    def update(self, **kwargs):
+        """
+        Bulk update tasks. When a counted column changes, the matching rows
+        are locked first and the counters adjusted in the same transaction.
+        ``updated_at`` is bumped, as auto_now only applies to save(), and
+        the rows get a new change sequence number. Tasks reassigned to
+        someone else leave a tombstone for their previous assignee.
+        """
+        kwargs.setdefault("updated_at", timezone.now())
+        changes = {
+            self.model._meta.get_field(name).name: value for name, value in kwargs.items()
+        }
+        if not set(COUNTED_FIELDS).intersection(changes):
+            with transaction.atomic(using=self.db, savepoint=False):
+                kwargs.setdefault("change_seq", TaskSequence.objects.using(self.db).stamp())
+                return super().update(**kwargs)
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            before = {
+                pk: tuple(state)
+                for pk, *state in self.order_by()
+                .select_for_update()
+                .values_list("pk", *COUNTED_FIELDS)
+            }
+            if not before:
+                return 0
+            change_seq = kwargs.setdefault("change_seq", TaskSequence.objects.using(self.db).stamp())
+            rows = self.model.objects.using(self.db).filter(pk__in=before)
+            updated = super(TaskQuerySet, rows).update(**kwargs)
+
+            if any(hasattr(value, "resolve_expression") for value in changes.values()):
+                # The database computed the new values; read them back
+                after = {pk: tuple(state) for pk, *state in rows.values_list("pk", *COUNTED_FIELDS)}
+            else:
+                literal = [
+                    getattr(changes[name], "pk", changes[name]) if name in changes else None
+                    for name in COUNTED_FIELDS
+                ]
+                after = {
+                    pk: tuple(
+                        new if name in changes else old
+                        for name, old, new in zip(COUNTED_FIELDS, state, literal)
+                    )
+                    for pk, state in before.items()
+                }
+
+            deltas = Counter()
+            for pk, state in after.items():
+                for key in Task.counter_keys(*before[pk]):
+                    deltas[key] -= 1
+                for key in Task.counter_keys(*state):
+                    deltas[key] += 1
+            TaskCounter.objects.apply(deltas)
+            TaskTombstone.objects.using(self.db).bulk_create(
+                TaskTombstone(
+                    task_id=pk,
+                    assigned_to_id=before[pk][0],
+                    created_by_id=before[pk][1],
+                    change_seq=change_seq,
+                )
+                for pk, state in after.items()
+                if state[0] != before[pk][0]
+            )
+            if hub.active:
+                hub.publish_on_commit(
+                    [
+                        task_event(event_kind(before[pk], state), pk, state, change_seq, before[pk])
+                        for pk, state in after.items()
+                    ],
+                    using=self.db,
+                )
+        return updated
+
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -31,23 +229,120 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     deadline = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Change sequence number of the last write, for the change feed (see TaskSequence)
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = TaskQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Task"
         verbose_name_plural = "Tasks"
+        indexes = [
+            # Member views and statistics
+            models.Index(fields=["assigned_to", "status"], name="task_assignee_status_idx"),
+            # Manager views and statistics
+            models.Index(fields=["created_by", "status"], name="task_creator_status_idx"),
+            # Overdue sweep
+            models.Index(fields=["status", "deadline"], name="task_status_deadline_idx"),
+            models.Index(
+                fields=["deadline"],
+                condition=models.Q(status__in=OPEN_STATUSES),
+                name="task_open_deadline_idx",
+            ),
+            # Default ordering and keyset pagination
+            models.Index(fields=["-created_at", "-id"], name="task_created_at_id_idx"),
+            # Collection versions for conditional GETs, per scope
+            models.Index(fields=["assigned_to", "updated_at"], name="task_assignee_updated_idx"),
+            models.Index(fields=["created_by", "updated_at"], name="task_creator_updated_idx"),
+            models.Index(fields=["updated_at"], name="task_updated_at_idx"),
+            # Change feed, per scope
+            models.Index(fields=["assigned_to", "change_seq"], name="task_assignee_change_idx"),
+            models.Index(fields=["created_by", "change_seq"], name="task_creator_change_idx"),
+            models.Index(fields=["change_seq"], name="task_change_seq_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.assigned_to.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        if not deferred.intersection(["assigned_to_id", "created_by_id", "status"]):
+            instance._counted_state = instance.counted_state
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.deadline < timezone.now() and self.status not in [
-            "completed",
-            "overdue",
-        ]:
+        if (
+            not settings.TASK_COMPUTED_OVERDUE
+            and self.deadline < timezone.now()
+            and self.status not in ["completed", "overdue"]
+        ):
             self.status = "overdue"
 
-        super().save(*args, **kwargs)
+        using = kwargs.get("using")
+        with transaction.atomic(using=using, savepoint=False):
+            previous = getattr(self, "_counted_state", None)
+            if previous is None and not self._state.adding:
+                previous = (
+                    Task._base_manager.filter(pk=self.pk)
+                    .values_list(*COUNTED_FIELDS)
+                    .first()
+                )
+            self.change_seq = TaskSequence.objects.using(using).stamp()
+            super().save(*args, **kwargs)
+
+            if previous is not None and previous[0] != self.assigned_to_id:
+                TaskTombstone.objects.using(using).create(
+                    task_id=self.pk,
+                    assigned_to_id=previous[0],
+                    created_by_id=previous[1],
+                    change_seq=self.change_seq,
+                )
+            if hub.active:
+                state = self.counted_state
+                hub.publish_on_commit(
+                    [task_event(event_kind(previous, state), self.pk, state, self.change_seq, previous)],
+                    using=using,
+                )
+
+            deltas = Counter()
+            if previous is not None:
+                for key in self.counter_keys(*previous):
+                    deltas[key] -= 1
+            for key in self.counter_keys(*self.counted_state):
+                deltas[key] += 1
+            TaskCounter.objects.apply(deltas)
+        self._counted_state = self.counted_state
+
+    @property
+    def counted_state(self):
+        """The columns TaskCounter rows are keyed on, in COUNTED_FIELDS order"""
+        return (self.assigned_to_id, self.created_by_id, self.status)
+
+    @staticmethod
+    def counter_keys(assigned_to_id, created_by_id, status):
+        """The (user_id, scope, status) counters a task with this state counts towards"""
+        keys = [(None, "all", status), (assigned_to_id, "assigned", status)]
+        if created_by_id is not None:
+            keys.append((created_by_id, "created", status))
+        return keys
+
+    @property
+    def effective_status(self):
+        """The status reported to clients, as in TaskQuerySet.with_effective_status"""
+        if (
+            settings.TASK_COMPUTED_OVERDUE
+            and self.status in OPEN_STATUSES
+            and self.deadline < timezone.now()
+        ):
+            return "overdue"
+        return self.status
+
+    def get_effective_status_display(self):
+        return dict(self.STATUS_CHOICES).get(self.effective_status, self.effective_status)
 
     @property
     def is_overdue(self):
@@ -62,3 +357,318 @@ class Task(models.Model):
 
         remaining = self.deadline - timezone.now()
         return remaining if remaining.total_seconds() > 0 else None
+
+
+class TaskCounterQuerySet(models.QuerySet):
+    def apply(self, deltas):
+        """
+        Add ``deltas``, a mapping of (user_id, scope, status) to a signed
+        change, to the counter rows, creating rows as needed. Keys are applied
+        in a stable order so concurrent writers lock rows consistently.
+
+        A decrement never creates a row: a missing counter means its user is
+        being deleted and the counter went with it.
+        """
+        for (user_id, scope, status), delta in sorted(
+            deltas.items(), key=lambda item: (item[0][0] or 0, *item[0][1:])
+        ):
+            if not delta:
+                continue
+            counter = self.filter(user_id=user_id, scope=scope, status=status)
+            if counter.update(count=models.F("count") + delta) or delta < 0:
+                continue
+            _, created = self.get_or_create(
+                user_id=user_id, scope=scope, status=status, defaults={"count": delta}
+            )
+            if not created:
+                counter.update(count=models.F("count") + delta)
+
+    def statistics(self, scope, user=None):
+        """
+        Total and per-status counts for one scope, shaped like
+        TaskQuerySet.status_counts(), from a single lookup on this table.
+
+        Counters hold stored statuses. With TASK_COMPUTED_OVERDUE, open tasks
+        past their deadline are moved over to overdue by one more count on
+        the open-deadline index, so the figures are exact between writes.
+        """
+        counters, late = self.statistics_queries(scope, user)
+        return self.merge_statistics(list(counters), list(late) if late is not None else [])
+
+    async def astatistics(self, scope, user=None):
+        """statistics() through the async ORM"""
+        counters, late = self.statistics_queries(scope, user)
+        return self.merge_statistics(
+            [row async for row in counters],
+            [row async for row in late] if late is not None else [],
+        )
+
+    def statistics_queries(self, scope, user):
+        counters = self.filter(user=user, scope=scope).values_list("status", "count")
+        if not settings.TASK_COMPUTED_OVERDUE:
+            return counters, None
+
+        late = Task.objects.filter(status__in=OPEN_STATUSES, deadline__lt=timezone.now())
+        if scope == "assigned":
+            late = late.filter(assigned_to=user)
+        elif scope == "created":
+            late = late.filter(created_by=user)
+        return counters, late.order_by().values_list("status").annotate(n=models.Count("id"))
+
+    @staticmethod
+    def merge_statistics(counters, late):
+        stats = {"total_tasks": 0}
+        stats.update({f"{value}_tasks": 0 for value, _ in Task.STATUS_CHOICES})
+        for status, count in counters:
+            stats[f"{status}_tasks"] = count
+            stats["total_tasks"] += count
+        for status, count in late:
+            stats[f"{status}_tasks"] -= count
+            stats["overdue_tasks"] += count
+        return stats
+
+    def expected(self):
+        """Recount every counter from the tasks table"""
+        expected = Counter()
+        tasks = Task.objects.order_by()
+        for row in tasks.values("status").annotate(n=models.Count("id")):
+            expected[(None, "all", row["status"])] = row["n"]
+        for row in tasks.values("assigned_to", "status").annotate(n=models.Count("id")):
+            expected[(row["assigned_to"], "assigned", row["status"])] = row["n"]
+        for row in (
+            tasks.filter(created_by__isnull=False)
+            .values("created_by", "status")
+            .annotate(n=models.Count("id"))
+        ):
+            expected[(row["created_by"], "created", row["status"])] = row["n"]
+        return expected
+
+    def mismatches(self):
+        """(key, stored, expected) for every counter that disagrees with the tasks table"""
+        expected = self.expected()
+        stored = {
+            (user_id, scope, status): count
+            for user_id, scope, status, count in self.values_list(
+                "user_id", "scope", "status", "count"
+            )
+        }
+        return [
+            (key, stored.get(key, 0), expected.get(key, 0))
+            for key in sorted(set(stored) | set(expected), key=lambda k: (k[0] or 0, *k[1:]))
+            if stored.get(key, 0) != expected.get(key, 0)
+        ]
+
+    def rebuild(self):
+        """Replace every counter with a fresh recount of the tasks table"""
+        with transaction.atomic(using=self.db):
+            expected = self.expected()
+            self.all().delete()
+            self.bulk_create(
+                TaskCounter(user_id=user_id, scope=scope, status=status, count=count)
+                for (user_id, scope, status), count in expected.items()
+            )
+        return len(expected)
+
+
+class TaskCounter(models.Model):
+    """
+    Denormalized task counts keyed by (user, scope, status), kept in step
+    with every task write. Rows without a user hold the global totals.
+    """
+
+    SCOPE_CHOICES = [
+        ("all", "All tasks"),
+        ("assigned", "Assigned to user"),
+        ("created", "Created by user"),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="task_counters",
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    objects = TaskCounterQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "scope", "status"], name="task_counter_unique"
+            ),
+            models.UniqueConstraint(
+                fields=["scope", "status"],
+                condition=models.Q(user__isnull=True),
+                name="task_counter_global_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user or 'All users'} / {self.scope} / {self.status}: {self.count}"
+
+
+class TaskSequenceQuerySet(models.QuerySet):
+    def stamp(self):
+        """
+        The change sequence number for writes made in the current
+        transaction; call inside it.
+
+        On PostgreSQL this is the transaction id, which takes no lock, so
+        task writes never wait on each other for it. Elsewhere a counter row
+        is advanced and stays locked until the transaction ends; SQLite
+        allows one writer at a time anyway.
+        """
+        connection = connections[self.db]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+                return cursor.fetchone()[0]
+
+        if not self.filter(pk=1).update(value=models.F("value") + 1):
+            self.get_or_create(pk=1)
+            self.filter(pk=1).update(value=models.F("value") + 1)
+        return self.filter(pk=1).values_list("value", flat=True).get()
+
+    def horizon(self):
+        """
+        One row with ``head``, the highest number whose transactions have
+        all finished, and ``purged_upto``. A reader that has seen every
+        write up to ``head`` never has an earlier one committed after it.
+
+        On PostgreSQL transaction ids are handed out in order but commit in
+        any order, so the head stops just below the oldest transaction still
+        running. The counter row's lock gives the same guarantee elsewhere.
+        """
+        if connections[self.db].vendor == "postgresql":
+            head = RawSQL(
+                "pg_snapshot_xmin(pg_current_snapshot())::text::bigint - 1",
+                [],
+                output_field=models.BigIntegerField(),
+            )
+        else:
+            head = models.F("value")
+        return self.filter(pk=1).annotate(head=head).values("head", "purged_upto")
+
+
+class TaskSequence(models.Model):
+    """
+    Source of Task.change_seq and TaskTombstone.change_seq (see stamp()).
+    ``value`` is the counter used outside PostgreSQL. ``purged_upto`` is
+    the highest number whose tombstones have been purged; change feed
+    cursors older than that cannot be served.
+    """
+
+    value = models.BigIntegerField(default=0)
+    purged_upto = models.BigIntegerField(default=0)
+
+    objects = TaskSequenceQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Task change sequence at {self.value}"
+
+
+class TaskTombstoneQuerySet(models.QuerySet):
+    def purge(self, before):
+        """
+        Delete tombstones recorded before ``before`` and move
+        TaskSequence.purged_upto past them. Returns the number deleted.
+        """
+        with transaction.atomic(using=self.db):
+            upto = self.filter(removed_at__lt=before).aggregate(upto=models.Max("change_seq"))["upto"]
+            if upto is None:
+                return 0
+            TaskSequence.objects.using(self.db).filter(pk=1, purged_upto__lt=upto).update(
+                purged_upto=upto
+            )
+            deleted, _ = self.filter(change_seq__lte=upto).delete()
+        return deleted
+
+
+class TaskTombstone(models.Model):
+    """
+    A task that left a scope of the change feed: deleted, or reassigned
+    away from ``assigned_to_id``. User ids are kept as plain integers so
+    tombstones outlive the users they mention.
+    """
+
+    task_id = models.BigIntegerField()
+    assigned_to_id = models.BigIntegerField()
+    created_by_id = models.BigIntegerField(null=True)
+    change_seq = models.BigIntegerField()
+    removed_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TaskTombstoneQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["assigned_to_id", "change_seq"], name="tombstone_assignee_idx"),
+            models.Index(fields=["created_by_id", "change_seq"], name="tombstone_creator_idx"),
+            models.Index(fields=["change_seq"], name="tombstone_change_seq_idx"),
+            models.Index(fields=["removed_at"], name="tombstone_removed_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} removed at change {self.change_seq}"
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    def enqueue(self, subject, message, recipient, html_message=None, from_email=None):
+        """
+        Queue an email for the outbox worker. Call inside the transaction
+        that makes the email true, so it is only sent if that commits.
+        """
+        return self.create(
+            subject=subject,
+            message=message,
+            html_message=html_message or "",
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL or "",
+            recipient=recipient,
+        )
+
+    def due(self, now=None):
+        """Pending emails whose next attempt is not in the future, oldest first"""
+        return self.filter(
+            status="pending", next_attempt_at__lte=now or timezone.now()
+        ).order_by("next_attempt_at", "id")
+
+
+class OutboxEmail(models.Model):
+    """
+    Transactional outbox for notification emails, drained in batches by
+    ``manage.py send_outbox_emails``.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("dead", "Dead"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    html_message = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name = "Outbox email"
+        verbose_name_plural = "Outbox emails"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts, capped"""
+    delay = settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def deliver_batch(batch_size=None, max_attempts=None):
+    """
+    Send up to ``batch_size`` due outbox emails over a single connection.
+
+    Rows are locked for the duration of the batch (skipping rows another
+    worker holds), so several workers can drain the outbox side by side.
+    A failed email is retried with exponential backoff and marked dead
+    after ``max_attempts`` failures.
+
+    Returns a dict of sent / retried / dead counts.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    results = {"sent": 0, "retried": 0, "dead": 0}
+
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.due().select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not emails:
+            return results
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            # Nothing can be sent this round; count it against every email
+            for email in emails:
+                results[fail(email, e, max_attempts)] += 1
+            return results
+
+        try:
+            for email in emails:
+                message = EmailMultiAlternatives(
+                    subject=email.subject,
+                    body=email.message,
+                    from_email=email.from_email or None,
+                    to=[email.recipient],
+                    connection=connection,
+                )
+                if email.html_message:
+                    message.attach_alternative(email.html_message, "text/html")
+
+                try:
+                    message.send()
+                except Exception as e:
+                    results[fail(email, e, max_attempts)] += 1
+                    continue
+
+                email.status = "sent"
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.last_error = ""
+                email.save(update_fields=["status", "attempts", "sent_at", "last_error"])
+                results["sent"] += 1
+        finally:
+            connection.close()
+
+    return results
+
+
+def fail(email, error, max_attempts):
+    """Record a failed attempt; returns "dead" or "retried" """
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    if email.attempts >= max_attempts:
+        email.status = "dead"
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+    return "dead" if email.status == "dead" else "retried"
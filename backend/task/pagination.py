@@ -0,0 +1,143 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Keyset pagination over tasks, newest first.
+
+    DRF's CursorPagination only stores the first ordering field and falls back
+    to an offset for ties. Here the cursor carries the full ``(created_at, id)``
+    key, so every page is a single range scan and deep pages cost the same as
+    the first one.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request):
+        """TASK_PAGE_SIZE, or ?page_size= capped at TASK_MAX_PAGE_SIZE"""
+        self.page_size = settings.TASK_PAGE_SIZE
+        self.max_page_size = settings.TASK_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views, fetching through the async ORM"""
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The queryset for one page, plus one row to tell if there are more"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        if reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+
+        if self.cursor is not None:
+            created_at, pk = self.cursor.position
+            # The leading range predicate keeps this an index range scan; the
+            # OR only breaks ties on created_at.
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gte=created_at)
+                    & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at)
+                    & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+                )
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        reverse = self.cursor is not None and self.cursor.reverse
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_paginated_data(self, data):
+        """The body of get_paginated_response(), for views that render it themselves"""
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return (instance["created_at"], instance["id"])
+        return (instance.created_at, instance.id)
+
+    def encode_cursor(self, cursor):
+        created_at, pk = cursor.position
+        tokens = {"p": created_at.isoformat(), "i": str(pk)}
+        if cursor.reverse:
+            tokens["r"] = "1"
+
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+
+            created_at = parse_datetime(tokens["p"][0])
+            pk = int(tokens["i"][0])
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None or timezone.is_naive(created_at):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=(created_at, pk))
@@ -0,0 +1,90 @@
+"""
+Relays task writes made by other processes to this process's streams.
+
+The hub only sees writes made in its own process. While any stream is
+open, the relay checks the change sequence every SSE_RELAY_INTERVAL
+seconds (one single-row query per process, however many streams) and
+publishes events for the tasks and tombstones written since, skipping
+the numbers the hub published itself. It cannot tell a status change
+from another edit, so those are reported as "updated".
+"""
+
+import asyncio
+import logging
+
+from django.conf import settings
+
+from .events import hub, task_event
+from .models import Task, TaskSequence, TaskTombstone
+
+logger = logging.getLogger(__name__)
+
+
+async def sequence_head():
+    """TaskSequence.horizon()'s head: every write numbered up to it has finished"""
+    value = await TaskSequence.objects.horizon().values_list("head", flat=True).afirst()
+    return value or 0
+
+
+async def relay_range(since, upto):
+    """Publish events for the writes numbered after ``since`` up to ``upto``"""
+    claimed = hub.claims(upto)
+    limit = settings.TASK_CHANGES_PAGE_SIZE
+    tasks = {
+        row[0]: row
+        async for row in Task.objects.filter(change_seq__gt=since, change_seq__lte=upto)
+        .exclude(change_seq__in=claimed)
+        .order_by("change_seq")
+        .values_list("id", "assigned_to", "created_by", "status", "change_seq")[:limit]
+    }
+    tombstones = [
+        row
+        async for row in TaskTombstone.objects.filter(change_seq__gt=since, change_seq__lte=upto)
+        .exclude(change_seq__in=claimed)
+        .order_by("change_seq")
+        .values_list("task_id", "assigned_to_id", "created_by_id", "change_seq")[:limit]
+    ]
+
+    if len(tasks) == limit or len(tombstones) == limit:
+        hub.publish_relayed([], since, upto)
+        hub.broadcast({"type": "resync", "cursor": upto})
+        return
+
+    events = []
+    for task_id, assigned_to, created_by, seq in tombstones:
+        task = tasks.pop(task_id, None)
+        if task is None:
+            events.append(task_event("deleted", task_id, (assigned_to, created_by, None), seq))
+        else:
+            state = task[1:4]
+            events.append(task_event("reassigned", task_id, state, task[4], previous=(assigned_to,)))
+    for task_id, *state, seq in tasks.values():
+        events.append(task_event("updated", task_id, tuple(state), seq))
+    hub.publish_relayed(sorted(events, key=lambda event: event["cursor"]), since, upto)
+
+
+class Relay:
+    def __init__(self):
+        self.task = None
+
+    def ensure_running(self):
+        """Start the relay on the running event loop unless it is already running there"""
+        loop = asyncio.get_running_loop()
+        if self.task is not None and not self.task.done() and self.task.get_loop() is loop:
+            return
+        self.task = loop.create_task(self.run())
+
+    async def run(self):
+        cursor = await sequence_head()
+        while hub.active:
+            await asyncio.sleep(settings.SSE_RELAY_INTERVAL)
+            try:
+                head = await sequence_head()
+                if head > cursor:
+                    await relay_range(cursor, head)
+                    cursor = head
+            except Exception:
+                logger.exception("Relaying task events failed")
+
+
+relay = Relay()
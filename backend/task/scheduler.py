@@ -0,0 +1,209 @@
+import logging
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from backend.user.tokens import purge_expired_tokens
+
+from .models import Task, TaskTombstone
+from .outbox import deliver_batch
+from .sweeper import OPEN_STATUSES, sweep_overdue
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    A periodic job run in-process by the Scheduler.
+
+    ``interval`` is the longest the job waits between runs. ``wake_at``, if
+    given, returns a datetime at which the job should run sooner (or None),
+    so event-driven jobs sleep exactly until they have work to do.
+    ``jitter`` adds up to that many random seconds to every wait.
+    """
+
+    def __init__(self, name, func, interval, wake_at=None, jitter=0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.wake_at = wake_at
+        self.jitter = jitter
+        self.next_run = 0.0
+        self.lock = threading.Lock()
+        self.stats = {
+            "runs": 0,
+            "failures": 0,
+            "skipped": 0,
+            "last_duration": None,
+            "max_duration": 0.0,
+            "total_duration": 0.0,
+            "last_error": "",
+        }
+
+    def schedule(self, now):
+        """Pick the next run time (monotonic seconds) after a run at ``now``"""
+        delay = self.interval
+        if self.wake_at is not None:
+            wake_at = self.wake_at()
+            if wake_at is not None:
+                until = (wake_at - timezone.now()).total_seconds()
+                # Never spin faster than once a second on work already due
+                delay = max(1.0, min(delay, until))
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        self.next_run = now + delay
+
+
+class Scheduler:
+    """
+    Runs periodic jobs in one long-lived process, sleeping until the next
+    job is due rather than polling on a fixed tick.
+
+    A job never overlaps with itself: within the process a per-job lock is
+    held while it runs, and on Postgres an advisory lock keeps a second
+    scheduler process from running the same job at the same time.
+    """
+
+    def __init__(self, jobs, clock=time.monotonic):
+        self.jobs = list(jobs)
+        self.clock = clock
+        self.stopped = threading.Event()
+
+    def run_job(self, job):
+        if not job.lock.acquire(blocking=False):
+            job.stats["skipped"] += 1
+            return
+        try:
+            close_old_connections()
+            with self.exclusive(job) as acquired:
+                if not acquired:
+                    job.stats["skipped"] += 1
+                    logger.info("Skipping %s: running in another process", job.name)
+                    return
+
+                start = self.clock()
+                try:
+                    job.func()
+                except Exception as e:
+                    job.stats["failures"] += 1
+                    job.stats["last_error"] = f"{type(e).__name__}: {e}"
+                    logger.exception("Scheduled job %s failed", job.name)
+                duration = self.clock() - start
+
+            job.stats["runs"] += 1
+            job.stats["last_duration"] = duration
+            job.stats["total_duration"] += duration
+            job.stats["max_duration"] = max(job.stats["max_duration"], duration)
+            logger.info("Ran %s in %.3fs", job.name, duration)
+        finally:
+            close_old_connections()
+            job.lock.release()
+
+    @contextmanager
+    def exclusive(self, job):
+        """Hold a cross-process lock for ``job`` where the database offers one"""
+        if connection.vendor != "postgresql":
+            yield True
+            return
+
+        key = zlib.crc32(f"scheduler:{job.name}".encode())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+    def run_pending(self):
+        """Run every due job once; returns seconds until the next one is due"""
+        for job in self.jobs:
+            if self.clock() >= job.next_run:
+                self.run_job(job)
+                job.schedule(self.clock())
+        return max(0.0, min(job.next_run for job in self.jobs) - self.clock())
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            self.stopped.wait(self.run_pending())
+
+    def stop(self):
+        self.stopped.set()
+
+
+def next_open_deadline():
+    """Earliest deadline among open tasks, i.e. when the next one goes overdue"""
+    return (
+        Task.objects.filter(status__in=OPEN_STATUSES)
+        .order_by("deadline")
+        .values_list("deadline", flat=True)
+        .first()
+    )
+
+
+def sweep_overdue_job():
+    tasks, _ = sweep_overdue(max_rows=settings.SCHEDULER_OVERDUE_MAX_ROWS)
+    if tasks:
+        logger.info("Marked %d tasks overdue", len(tasks))
+
+
+def purge_expired_tokens_job():
+    purged, _ = purge_expired_tokens()
+    if purged:
+        logger.info("Purged %d expired tokens", purged)
+
+
+def purge_tombstones_job():
+    before = timezone.now() - timedelta(days=settings.TASK_TOMBSTONE_RETENTION_DAYS)
+    purged = TaskTombstone.objects.purge(before)
+    if purged:
+        logger.info("Purged %d task tombstones", purged)
+
+
+def deliver_outbox_job():
+    while sum(deliver_batch().values()) >= settings.OUTBOX_BATCH_SIZE:
+        pass
+
+
+def default_jobs():
+    jitter = settings.SCHEDULER_JITTER_SECONDS
+    jobs = []
+    if not settings.TASK_COMPUTED_OVERDUE:
+        jobs.append(
+            Job(
+                "overdue_sweep",
+                sweep_overdue_job,
+                interval=settings.SCHEDULER_OVERDUE_MAX_INTERVAL,
+                wake_at=next_open_deadline,
+                jitter=jitter,
+            )
+        )
+    return jobs + [
+        Job(
+            "purge_expired_tokens",
+            purge_expired_tokens_job,
+            interval=settings.SCHEDULER_TOKEN_CLEANUP_INTERVAL,
+            jitter=jitter,
+        ),
+        Job(
+            "purge_tombstones",
+            purge_tombstones_job,
+            interval=settings.SCHEDULER_TOMBSTONE_CLEANUP_INTERVAL,
+            jitter=jitter,
+        ),
+        Job(
+            "deliver_outbox",
+            deliver_outbox_job,
+            interval=settings.SCHEDULER_OUTBOX_INTERVAL,
+            jitter=jitter,
+        ),
+    ]
@@ -0,0 +1,73 @@
+"""
+Full-text search over task titles and descriptions.
+
+The index lives outside the Django model, since each database builds it
+differently (see migration 0008_task_search):
+
+- PostgreSQL: ``task_task.search_vector``, a stored generated tsvector
+  (title weighted above description) with a GIN index. The database keeps
+  it current on every insert and update.
+- SQLite: ``task_task_fts``, an FTS5 table over task_task kept current by
+  triggers. Django rebuilds SQLite tables for some schema changes, which
+  drops the triggers; a migration that alters task_task must recreate them.
+
+Other databases fall back to unindexed ``icontains`` matching.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Text search configuration of the PostgreSQL index
+SEARCH_CONFIG = "english"
+
+
+def fts5_query(text):
+    """``text`` as an FTS5 query matching every word, with no query syntax"""
+    words = re.findall(r"\w+", text)
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def search_tasks(tasks, text):
+    """
+    Tasks in ``tasks`` matching every word of ``text``, annotated with a
+    ``search_rank`` (higher is better) and ordered best first.
+    """
+    connection = connections[tasks.db]
+    table = connection.ops.quote_name(tasks.model._meta.db_table)
+
+    if connection.vendor == "postgresql":
+        query = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        tasks = tasks.filter(
+            RawSQL(f"{table}.search_vector @@ {query}", [text], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f"ts_rank_cd({table}.search_vector, {query})", [text], output_field=FloatField())
+        )
+    elif connection.vendor == "sqlite":
+        query = fts5_query(text)
+        if not query:
+            return tasks.none()
+        tasks = tasks.filter(
+            RawSQL(
+                f"{table}.id IN (SELECT rowid FROM task_task_fts WHERE task_task_fts MATCH %s)",
+                [query],
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            # bm25() is lower for better matches; titles count 2.5 times as much
+            search_rank=RawSQL(
+                "(SELECT -bm25(task_task_fts, 2.5, 1.0) FROM task_task_fts"
+                f" WHERE task_task_fts MATCH %s AND rowid = {table}.id)",
+                [query],
+                output_field=FloatField(),
+            )
+        )
+    else:
+        condition = Q()
+        for word in text.split():
+            condition &= Q(title__icontains=word) | Q(description__icontains=word)
+        tasks = tasks.filter(condition).annotate(search_rank=Value(0.0))
+
+    return tasks.order_by("-search_rank", "-created_at", "-id")
@@ -2,10 +2,32 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from .models import Task
+from .transitions import can_transition, transition_error
 
 User = get_user_model()
 
 
+def format_time_remaining(status, deadline, now):
+    """Human readable time left until the deadline, or None if completed or past"""
+    if status == "completed":
+        return None
+
+    remaining = deadline - now
+    if remaining.total_seconds() <= 0:
+        return None
+
+    days = remaining.days
+    hours, remainder = divmod(remaining.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+
+    if days > 0:
+        return f"{days} days, {hours} hours"
+    elif hours > 0:
+        return f"{hours} hours, {minutes} minutes"
+    else:
+        return f"{minutes} minutes"
+
+
 class TaskSerializer(serializers.ModelSerializer):
     assigned_to_username = serializers.CharField(
         source="assigned_to.username", read_only=True
@@ -19,9 +41,12 @@ class TaskSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(  
         source="created_by.get_full_name", read_only=True
     )
+    status = serializers.CharField(source="effective_status", read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
     time_remaining = serializers.SerializerMethodField()
-    status_display = serializers.CharField(source="get_status_display", read_only=True)
+    status_display = serializers.CharField(
+        source="get_effective_status_display", read_only=True
+    )
 
     class Meta:
         model = Task
@@ -46,23 +71,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
     def get_time_remaining(self, obj):
         """Calculate time remaining until deadline"""
-        if obj.status == "completed":
-            return None
-
-        remaining = obj.deadline - timezone.now()
-        if remaining.total_seconds() <= 0:
-            return None
-
-        days = remaining.days
-        hours, remainder = divmod(remaining.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-
-        if days > 0:
-            return f"{days} days, {hours} hours"
-        elif hours > 0:
-            return f"{hours} hours, {minutes} minutes"
-        else:
-            return f"{minutes} minutes"
+        return format_time_remaining(obj.status, obj.deadline, timezone.now())
 
     def validate_assigned_to(self, value):
         """Ensure assigned user has 'member' role"""
@@ -79,9 +88,112 @@ class TaskSerializer(serializers.ModelSerializer):
         return value
 
 
+class TaskRowSerializer:
+    """
+    Read-only fast path for task lists.
+
+    Builds the same output as TaskSerializer from ``values()`` rows, without
+    per-row field machinery. ``now`` and the output timezone are resolved
+    once per response rather than once per row.
+    """
+
+    values_fields = (
+        "id",
+        "title",
+        "description",
+        "assigned_to",
+        "assigned_to__username",
+        "assigned_to__first_name",
+        "assigned_to__last_name",
+        "created_by",
+        "created_by__username",
+        "created_by__first_name",
+        "created_by__last_name",
+        "status",
+        "deadline",
+        "created_at",
+    )
+
+    def __init__(self, rows, now=None):
+        self.rows = rows
+        self.now = now or timezone.now()
+        self.tz = timezone.get_current_timezone()
+        self.status_labels = dict(Task.STATUS_CHOICES)
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.with_effective_status().values(*cls.values_fields, "effective_status")
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+    def stream(self):
+        """Lazily serialize rows one at a time, for use with streaming responses"""
+        for row in self.rows:
+            yield self.to_representation(row)
+
+    def format_datetime(self, value):
+        # Matches serializers.DateTimeField with the default ISO 8601 format
+        value = value.astimezone(self.tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[: -len("+00:00")] + "Z"
+        return value
+
+    def to_representation(self, row):
+        status = row["effective_status"]
+        data = {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "assigned_to": row["assigned_to"],
+            "assigned_to_username": row["assigned_to__username"],
+            "assigned_to_name": f"{row['assigned_to__first_name']} {row['assigned_to__last_name']}".strip(),
+            "created_by": row["created_by"],
+        }
+        # TaskSerializer skips the creator fields when created_by is null
+        if row["created_by"] is not None:
+            data["created_by_username"] = row["created_by__username"]
+            data["created_by_name"] = f"{row['created_by__first_name']} {row['created_by__last_name']}".strip()
+        data.update(
+            {
+                "status": status,
+                "status_display": self.status_labels.get(status, status),
+                "deadline": self.format_datetime(row["deadline"]),
+                "created_at": self.format_datetime(row["created_at"]),
+                "is_overdue": row["deadline"] < self.now and status != "completed",
+                "time_remaining": format_time_remaining(status, row["deadline"], self.now),
+            }
+        )
+        return data
+
+
+def user_pk(data):
+    """The user id in ``data`` if it is an int or a string of digits, else None"""
+    if isinstance(data, int) and not isinstance(data, bool):
+        return data
+    if isinstance(data, str) and data.isascii() and data.isdigit():
+        return int(data)
+    return None
+
+
+class UserPkField(serializers.PrimaryKeyRelatedField):
+    """
+    A user primary key field that rejects values such as ``1.9`` or ``true``,
+    which the database lookup would otherwise coerce to a valid id.
+    """
+
+    def to_internal_value(self, data):
+        if user_pk(data) is None:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        return super().to_internal_value(data)
+
+
 class TaskCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating tasks (admin only)"""
 
+    serializer_related_field = UserPkField
+
     class Meta:
         model = Task
         fields = ["title", "description", "assigned_to", "deadline"]
@@ -101,9 +213,33 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         return value
 
 
+class PrefetchedUserField(UserPkField):
+    """
+    Resolves user ids against a ``users`` dict in the serializer context
+    (e.g. from ``User.objects.in_bulk``) instead of querying per row.
+    """
+
+    def to_internal_value(self, data):
+        pk = user_pk(data)
+        if pk is None:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.context["users"][pk]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class TaskBulkCreateSerializer(TaskCreateSerializer):
+    """Serializer for one row of a bulk task import (admin and manager only)"""
+
+    assigned_to = PrefetchedUserField(queryset=User.objects.all())
+
+
 class TaskUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating tasks (admin only)"""
 
+    serializer_related_field = UserPkField
+
     class Meta:
         model = Task
         fields = ["title", "description", "assigned_to", "deadline"]
@@ -132,28 +268,17 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
 class TaskStatusUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating task status (user only)"""
 
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES)
+
     class Meta:
         model = Task
         fields = ["status"]
 
     def validate_status(self, value):
-        """Validate status transitions"""
-        if not self.instance:
-            raise serializers.ValidationError("Task instance is required.")
-
-        current_status = self.instance.status
-
-        # Define valid status transitions
-        valid_transitions = {
-            "pending": ["in_progress"],
-            "in_progress": ["completed"],
-            "overdue": ["completed"],
-            "completed": [],  # Cannot change from completed
-        }
-
-        if value not in valid_transitions.get(current_status, []):
+        """Validate status transitions against the current status, if known"""
+        if self.instance and not can_transition(self.instance.effective_status, value):
             raise serializers.ValidationError(
-                f"Cannot change status from '{current_status}' to '{value}'"
+                transition_error(self.instance.effective_status, value)
             )
 
         return value
@@ -0,0 +1,77 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .events import hub, task_event
+from .models import Task, TaskCounter, TaskSequence, TaskTombstone
+
+User = get_user_model()
+
+# User fields copied into serialized tasks (usernames and full names)
+TASK_USER_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(post_delete, sender=Task)
+def decrement_task_counters(sender, instance, **kwargs):
+    """
+    Runs for single deletes, queryset deletes and cascades from user
+    deletion alike, inside the deleting transaction.
+    """
+    state = getattr(instance, "_counted_state", None) or instance.counted_state
+    TaskCounter.objects.apply(Counter({key: -1 for key in Task.counter_keys(*state)}))
+
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, using, **kwargs):
+    """Leave a tombstone for the change feed, in the deleting transaction"""
+    change_seq = TaskSequence.objects.using(using).stamp()
+    TaskTombstone.objects.using(using).create(
+        task_id=instance.pk,
+        assigned_to_id=instance.assigned_to_id,
+        created_by_id=instance.created_by_id,
+        change_seq=change_seq,
+    )
+    if hub.active:
+        hub.publish_on_commit(
+            [task_event("deleted", instance.pk, instance.counted_state, change_seq)], using=using
+        )
+
+
+@receiver(pre_delete, sender=User)
+def release_created_tasks(sender, instance, using, **kwargs):
+    """
+    Clear the creator of a deleted user's tasks through TaskQuerySet.update,
+    so the change shows up in the change feed. The SET_NULL that follows
+    then finds nothing left to update.
+    """
+    Task.objects.using(using).filter(created_by=instance.pk).update(created_by=None)
+
+
+@receiver(pre_save, sender=User)
+def remember_task_user_fields(sender, instance, raw, using, update_fields, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields).intersection(TASK_USER_FIELDS):
+        return  # e.g. last_login on every sign-in
+    instance._task_user_fields = (
+        User.objects.using(using).filter(pk=instance.pk).values_list(*TASK_USER_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_tasks_of_renamed_user(sender, instance, using, **kwargs):
+    """
+    Tasks embed their assignee's and creator's names, so renaming a user
+    changes how those tasks serialize. Bump them through
+    TaskQuerySet.update (``updated_at`` and the change sequence), so that
+    collection ETags and the change feed move with the name.
+    """
+    previous = instance.__dict__.pop("_task_user_fields", None)
+    if previous is None or previous == tuple(getattr(instance, name) for name in TASK_USER_FIELDS):
+        return
+    Task.objects.using(using).filter(
+        Q(assigned_to=instance.pk) | Q(created_by=instance.pk)
+    ).update()
@@ -0,0 +1,51 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+
+def iter_json_array(items, batch_size=500):
+    """
+    Encode an iterable of JSON-serializable items as a JSON array, yielding
+    one chunk of text per ``batch_size`` items so memory stays bounded.
+    Output matches DRF's JSONRenderer defaults (compact, unicode).
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    yield "["
+    batch = []
+    first = True
+    for item in items:
+        batch.append(encode(item))
+        if len(batch) >= batch_size:
+            yield ("" if first else ",") + ",".join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ("" if first else ",") + ",".join(batch)
+    yield "]"
+
+
+async def aiter_chunks(chunks):
+    """
+    Serve a sync iterator to an ASGI server, producing each chunk on the
+    request's sync thread (where its database cursor lives) instead of
+    letting Django read the whole iterator into memory first.
+    """
+    done = object()
+    take = sync_to_async(next)
+    try:
+        while (chunk := await take(chunks, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def streaming_json_response(items, batch_size=500, asynchronous=False):
+    """
+    Stream ``items`` as a JSON array. Pass ``asynchronous=True`` when
+    serving an ASGI request, so the response streams there too.
+    """
+    content = iter_json_array(items, batch_size)
+    if asynchronous:
+        content = aiter_chunks(content)
+    return StreamingHttpResponse(content, content_type="application/json")
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OPEN_STATUSES, Task
+
+
+def sweep_overdue(now=None, chunk_size=None, max_rows=None, dry_run=False):
+    """
+    Mark open tasks whose deadline has passed as overdue.
+
+    Works through matching tasks in ``(deadline, id)`` order, ``chunk_size``
+    rows per transaction, so no single statement locks the whole backlog.
+    Each chunk is locked and read before it is updated, so the reported
+    tasks are exactly the ones changed. Stops after ``max_rows`` tasks if
+    given. With ``dry_run`` nothing is written.
+
+    Returns ``(tasks, has_more)``, where ``tasks`` is a list of dicts with
+    the id, title, assignee username and previous status of every task swept.
+    With TASK_COMPUTED_OVERDUE overdue is derived at read time and there is
+    nothing to sweep.
+    """
+    if settings.TASK_COMPUTED_OVERDUE:
+        return [], False
+
+    now = now or timezone.now()
+    chunk_size = chunk_size or settings.OVERDUE_SWEEP_CHUNK_SIZE
+    overdue = Task.objects.filter(status__in=OPEN_STATUSES, deadline__lt=now).order_by(
+        "deadline", "id"
+    )
+
+    swept = []
+    last = None
+    while max_rows is None or len(swept) < max_rows:
+        limit = chunk_size if max_rows is None else min(chunk_size, max_rows - len(swept))
+        chunk = overdue
+        if last is not None:
+            # Keyset on the deadline index; also how dry runs move forward
+            chunk = chunk.filter(
+                Q(deadline__gt=last[0]) | Q(deadline=last[0], id__gt=last[1])
+            )
+
+        with transaction.atomic():
+            rows = list(
+                chunk.select_for_update(skip_locked=True, of=("self",)).values(
+                    "id", "title", "assigned_to__username", "status", "deadline"
+                )[:limit]
+            )
+            if not rows:
+                return swept, False
+            if not dry_run:
+                Task.objects.filter(pk__in=[row["id"] for row in rows]).update(
+                    status="overdue"
+                )
+
+        last = (rows[-1]["deadline"], rows[-1]["id"])
+        swept.extend(
+            {
+                "id": row["id"],
+                "title": row["title"],
+                "assigned_to": row["assigned_to__username"],
+                "previous_status": row["status"],
+            }
+            for row in rows
+        )
+        if len(rows) < limit:
+            return swept, False
+
+    return swept, overdue.filter(
+        Q(deadline__gt=last[0]) | Q(deadline=last[0], id__gt=last[1])
+    ).exists()
@@ -1,3 +1,1289 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from base64 import b64encode
+from datetime import timedelta
+from io import StringIO
+from time import perf_counter
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.metrics import registry
+
+from .changes import read_changes
+from .events import hub
+from .models import OPEN_STATUSES, OutboxEmail, Task, TaskCounter, TaskTombstone
+from .relay import relay, relay_range
+from .search import search_tasks
+from .scheduler import Job, Scheduler, next_open_deadline
+from .serializers import TaskRowSerializer, TaskSerializer
+from .streaming import iter_json_array
+from .sweeper import sweep_overdue
+
+User = get_user_model()
+
+
+class TaskTestMixin:
+    """Shared users and helpers for task API tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin", "admin@example.com", "pass", first_name="Ada", last_name="Admin", role="admin"
+        )
+        cls.manager = User.objects.create_user(
+            "manager", "manager@example.com", "pass", first_name="Max", last_name="Manager", role="manager"
+        )
+        cls.member = User.objects.create_user(
+            "member", "member@example.com", "pass", first_name="Mia", last_name="Member", role="member"
+        )
+        cls.other_member = User.objects.create_user(
+            "other", "other@example.com", "pass", first_name="Otto", last_name="Other", role="member"
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def make_tasks(self, count, assigned_to=None, created_by=None, **kwargs):
+        kwargs.setdefault("deadline", timezone.now() + timedelta(days=1))
+        return Task.objects.bulk_create(
+            Task(
+                title=f"Task {i}",
+                description="Description",
+                assigned_to=assigned_to or self.member,
+                created_by=created_by or self.manager,
+                **kwargs,
+            )
+            for i in range(count)
+        )
+
+
+class TaskQueryCountTests(TaskTestMixin, TestCase):
+    """
+    Guard against N+1 queries: every read path must cost the same number of
+    queries whether it returns one task or many.
+    """
+
+    def assertConstantQueries(self, client, url, queries=1):
+        Task.objects.all().delete()
+        self.make_tasks(1)
+        with self.assertNumQueries(queries):
+            client.get(url)
+        self.make_tasks(10)
+        self.make_tasks(10, assigned_to=self.other_member, created_by=self.admin)
+        with self.assertNumQueries(queries):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    # Conditional GET endpoints add one aggregate for their ETag
+
+    def test_task_list(self):
+        self.assertConstantQueries(self.client_for(self.admin), reverse("task-list-create"), 2)
+
+    def test_all_tasks(self):
+        self.assertConstantQueries(self.client_for(self.manager), reverse("all-tasks"))
+
+    def test_my_tasks(self):
+        self.assertConstantQueries(self.client_for(self.member), reverse("my-tasks"), 2)
+
+    def test_task_detail(self):
+        task = self.make_tasks(1)[0]
+        with self.assertNumQueries(1):
+            response = self.client_for(self.admin).get(reverse("task-detail", args=[task.pk]))
+        self.assertEqual(response.json()["assigned_to_name"], "Mia Member")
+        self.assertEqual(response.json()["created_by_username"], "manager")
+
+    def test_task_statistics(self):
+        self.make_tasks(3)
+        self.make_tasks(2, status="completed")
+        self.make_tasks(4, assigned_to=self.other_member, created_by=self.admin)
+        for user, total, completed in [
+            (self.admin, 9, 2),
+            (self.manager, 5, 2),
+            (self.other_member, 4, 0),
+        ]:
+            with self.assertNumQueries(2):
+                response = self.client_for(user).get(reverse("task-statistics"))
+            self.assertEqual(response.json()["total_tasks"], total)
+            self.assertEqual(response.json()["completed_tasks"], completed)
+            for value, _ in Task.STATUS_CHOICES:
+                self.assertIn(f"{value}_tasks", response.json())
+
+    def test_manager_team_members(self):
+        self.make_tasks(2)
+        self.make_tasks(3, assigned_to=self.other_member, status="overdue")
+        with self.assertNumQueries(1):
+            response = self.client_for(self.manager).get(
+                reverse("manager-team-members"), {"ordering": "-overdue_tasks"}
+            )
+        self.assertEqual([row["username"] for row in response.json()], ["other", "member"])
+        self.assertEqual(response.json()[0]["overdue_tasks"], 3)
+        self.assertEqual(response.json()[1]["total_tasks"], 2)
+
+
+@override_settings(TASK_PAGE_SIZE=2, TASK_MAX_PAGE_SIZE=3)
+class TaskPaginationTests(TaskTestMixin, TestCase):
+    def page(self, url, status_code=200, **params):
+        response = self.client_for(self.admin).get(url, params)
+        self.assertEqual(response.status_code, status_code)
+        return response.json()
+
+    def test_walks_ties_on_created_at(self):
+        tasks = self.make_tasks(5)
+        Task.objects.update(created_at=timezone.now())
+        expected = sorted(task.id for task in tasks)[::-1]
+
+        seen, url, pages = [], reverse("all-tasks"), []
+        while url:
+            page = self.page(url)
+            pages.append(page)
+            seen += [task["id"] for task in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page["results"]) for page in pages], [2, 2, 1])
+
+        # Walking back returns the same pages
+        back = self.page(pages[-1]["previous"])
+        self.assertEqual(back["results"], pages[-2]["results"])
+        back = self.page(back["previous"])
+        self.assertEqual(back["results"], pages[0]["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_invalid_cursors(self):
+        self.make_tasks(3)
+        now = timezone.now()
+        for querystring in [
+            "p=not-a-date&i=1",
+            f"p={now.replace(tzinfo=None).isoformat()}&i=1",
+            f"p={now.isoformat()}&i=abc",
+            f"p={now.isoformat()}",
+            f"i=1&r=yes&p={now.isoformat()}",
+        ]:
+            cursor = b64encode(querystring.encode()).decode()
+            with self.subTest(querystring):
+                self.page(reverse("all-tasks"), status_code=404, cursor=cursor)
+        for cursor in ["!!!", "é", b64encode(b"\xff\xfe").decode()]:
+            with self.subTest(cursor):
+                self.page(reverse("all-tasks"), status_code=404, cursor=cursor)
+
+    def test_page_size_is_clamped(self):
+        self.make_tasks(5)
+        for page_size, expected in [(None, 2), ("1", 1), ("3", 3), ("1000", 3), ("0", 2), ("-1", 2), ("x", 2)]:
+            params = {} if page_size is None else {"page_size": page_size}
+            with self.subTest(page_size):
+                self.assertEqual(len(self.page(reverse("all-tasks"), **params)["results"]), expected)
+
+        with override_settings(TASK_PAGE_SIZE=4):
+            self.assertEqual(len(self.page(reverse("all-tasks"))["results"]), 4)
+
+
+class TaskIndexTests(TaskTestMixin, TestCase):
+    """The query planner should pick the composite indexes on the hot paths"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        statuses = [value for value, _ in Task.STATUS_CHOICES]
+        Task.objects.bulk_create(
+            Task(
+                title=f"Task {i}",
+                description="Description",
+                assigned_to=cls.member if i % 2 else cls.other_member,
+                created_by=cls.manager if i % 3 else cls.admin,
+                status=statuses[i % len(statuses)],
+                deadline=now + timedelta(hours=i - 1000),
+            )
+            for i in range(2000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Keep small test tables from tempting the planner into seq scans
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        self.assertIn(index_name, queryset.explain())
+
+    # Counts and sweeps run unordered; clear Meta.ordering to match them.
+
+    def test_assignee_status(self):
+        self.assertUsesIndex(
+            Task.objects.filter(assigned_to=self.member, status="pending").order_by(),
+            "task_assignee_status_idx",
+        )
+
+    def test_creator_status(self):
+        self.assertUsesIndex(
+            Task.objects.filter(created_by=self.manager, status="overdue").order_by(),
+            "task_creator_status_idx",
+        )
+
+    def test_overdue_sweep(self):
+        self.assertUsesIndex(
+            Task.objects.filter(
+                status__in=["pending", "in_progress"], deadline__lt=timezone.now()
+            ).order_by(),
+            "task_status_deadline_idx",
+        )
+
+    # SQLite cannot match a bound "status IN (?, ?)" against the index predicate
+    @skipUnless(connection.vendor == "postgresql", "Partial IN index is matched on PostgreSQL only")
+    def test_open_tasks_by_deadline(self):
+        self.assertUsesIndex(
+            Task.objects.filter(status__in=OPEN_STATUSES).order_by("deadline"),
+            "task_open_deadline_idx",
+        )
+
+    def test_default_ordering(self):
+        self.assertUsesIndex(
+            Task.objects.order_by("-created_at", "-id")[:50],
+            "task_created_at_id_idx",
+        )
+
+
+class TaskCounterTests(TaskTestMixin, TestCase):
+    """Counters must match a recount of the tasks table after every write path"""
+
+    def assertCountersConsistent(self):
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+    def test_api_write_paths(self):
+        manager = self.client_for(self.manager)
+        member = self.client_for(self.member)
+        deadline = timezone.now() + timedelta(days=2)
+
+        for _ in range(3):
+            response = manager.post(
+                reverse("task-list-create"),
+                {"title": "New", "description": "d", "assigned_to": self.member.pk, "deadline": deadline},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertCountersConsistent()
+        first, second, third = Task.objects.order_by("id")
+
+        member.post(reverse("start-task", args=[first.pk]))
+        member.post(reverse("complete-task", args=[first.pk]))
+        member.patch(reverse("update-task-status", args=[second.pk]), {"status": "in_progress"}, format="json")
+        self.assertCountersConsistent()
+
+        response = manager.patch(
+            reverse("task-detail", args=[third.pk]), {"assigned_to": self.other_member.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersConsistent()
+
+        manager.delete(reverse("task-detail", args=[second.pk]))
+        self.assertCountersConsistent()
+
+        stats = manager.get(reverse("task-statistics")).json()
+        self.assertEqual(stats["total_tasks"], 2)
+        self.assertEqual(stats["completed_tasks"], 1)
+
+    def test_bulk_paths(self):
+        self.make_tasks(5)
+        self.make_tasks(3, assigned_to=self.other_member)
+        Task.objects.filter(assigned_to=self.member).update(deadline=timezone.now() - timedelta(hours=1))
+        self.client_for(self.admin).post(reverse("update-overdue-tasks"))
+        self.assertEqual(TaskCounter.objects.statistics("assigned", self.member)["overdue_tasks"], 5)
+        self.assertCountersConsistent()
+
+        self.other_member.delete()
+        self.assertCountersConsistent()
+        self.manager.delete()
+        self.assertCountersConsistent()
+
+    def test_rebuild_command(self):
+        self.make_tasks(4)
+        TaskCounter.objects.filter(scope="all").update(count=0)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_task_counters", "--verify", stdout=StringIO())
+        call_command("rebuild_task_counters", stdout=StringIO())
+        self.assertCountersConsistent()
+
+
+class TaskRowSerializerTests(TaskTestMixin, TestCase):
+    def render_both(self, queryset):
+        now = timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            slow = JSONRenderer().render(TaskSerializer(queryset.with_users(), many=True).data)
+            fast = JSONRenderer().render(
+                TaskRowSerializer(TaskRowSerializer.values(queryset), now=now).data
+            )
+        return slow, fast
+
+    def test_matches_task_serializer(self):
+        now = timezone.now()
+        for offset in [timedelta(days=3), timedelta(hours=5), timedelta(minutes=7), -timedelta(hours=1)]:
+            self.make_tasks(1, deadline=now + offset)
+            self.make_tasks(1, deadline=now + offset, status="completed")
+        self.make_tasks(2, created_by=self.admin, status="in_progress")
+        Task.objects.filter(pk=Task.objects.order_by("id").first().pk).update(created_by=None)
+        self.other_member.first_name = ""
+        self.other_member.save()
+        self.make_tasks(1, assigned_to=self.other_member)
+
+        slow, fast = self.render_both(Task.objects.all())
+        self.assertEqual(slow, fast)
+
+    def test_streamed_dump(self):
+        self.make_tasks(7)
+        response = self.client_for(self.admin).get(reverse("all-tasks"), {"stream": "true"})
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content)
+        rows = TaskRowSerializer.values(Task.objects.order_by("-created_at", "-id"))
+        self.assertEqual(len(json.loads(body)), 7)
+
+        data = TaskRowSerializer(rows).data
+        rendered = JSONRenderer().render(data).decode()
+        for batch_size in [1, 3, 7, 50]:
+            self.assertEqual("".join(iter_json_array(data, batch_size)), rendered)
+        self.assertEqual("".join(iter_json_array([])), "[]")
+
+    async def test_streamed_dump_under_asgi(self):
+        await sync_to_async(self.make_tasks)(7)
+        response = await AsyncClient().get(
+            reverse("all-tasks"),
+            {"stream": "true"},
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.admin)}"},
+        )
+        # An async iterator: Django would otherwise buffer the whole dump
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(json.loads(b"".join(chunks))), 7)
+
+    @tag("benchmark")
+    def test_benchmark_10k_rows(self):
+        self.make_tasks(10000)
+        queryset = Task.objects.all()
+
+        start = perf_counter()
+        slow = JSONRenderer().render(TaskSerializer(queryset.with_users(), many=True).data)
+        slow_time = perf_counter() - start
+
+        start = perf_counter()
+        fast = JSONRenderer().render(TaskRowSerializer(TaskRowSerializer.values(queryset)).data)
+        fast_time = perf_counter() - start
+
+        self.assertEqual(len(slow), len(fast))
+        self.assertLess(fast_time, slow_time / 2)
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP unavailable")
+
+
+class OutboxTests(TaskTestMixin, TestCase):
+    def create_task(self):
+        return self.client_for(self.manager).post(
+            reverse("task-list-create"),
+            {
+                "title": "Write report",
+                "description": "Quarterly numbers",
+                "assigned_to": self.member.pk,
+                "deadline": timezone.now() + timedelta(days=2),
+            },
+            format="json",
+        )
+
+    def test_task_creation_queues_instead_of_sending(self):
+        self.assertEqual(self.create_task().status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.recipient, "member@example.com")
+        self.assertEqual(email.subject, "New Task Assigned: Write report")
+
+    def test_worker_drains_outbox(self):
+        for _ in range(3):
+            self.create_task()
+        call_command("send_outbox_emails", "--batch-size", "2", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0].mimetype, "text/html")
+        self.assertFalse(OutboxEmail.objects.exclude(status="sent").exists())
+
+    @override_settings(EMAIL_BACKEND="backend.task.tests.FailingEmailBackend")
+    def test_failures_back_off_then_dead_letter(self):
+        self.create_task()
+        call_command("send_outbox_emails", "--max-attempts", "2", stdout=StringIO())
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ("pending", 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn("SMTP unavailable", email.last_error)
+
+        # Not due yet, so nothing happens
+        call_command("send_outbox_emails", "--max-attempts", "2", stdout=StringIO())
+        self.assertEqual(OutboxEmail.objects.get().attempts, 1)
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        call_command("send_outbox_emails", "--max-attempts", "2", stdout=StringIO())
+        self.assertEqual(OutboxEmail.objects.get().status, "dead")
+
+
+class BulkCreateTests(TaskTestMixin, TestCase):
+    def rows(self, count, assigned_to):
+        deadline = timezone.now() + timedelta(days=3)
+        return [
+            {"title": f"Import {i}", "description": "d", "assigned_to": assigned_to.pk, "deadline": deadline}
+            for i in range(count)
+        ]
+
+    def test_creates_all_rows_with_one_email_per_assignee(self):
+        rows = self.rows(20, self.member) + self.rows(10, self.other_member)
+        response = self.client_for(self.manager).post(reverse("task-bulk-create"), rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 30)
+        self.assertEqual(Task.objects.filter(created_by=self.manager).count(), 30)
+        self.assertEqual(
+            sorted(OutboxEmail.objects.values_list("subject", flat=True)),
+            ["10 New Tasks Assigned", "20 New Tasks Assigned"],
+        )
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        client = self.client_for(self.manager)
+        # The first import also creates the counter rows
+        client.post(reverse("task-bulk-create"), self.rows(1, self.member), format="json")
+        with CaptureQueriesContext(connection) as small:
+            client.post(reverse("task-bulk-create"), self.rows(2, self.member), format="json")
+        with self.assertNumQueries(len(small.captured_queries)):
+            client.post(reverse("task-bulk-create"), self.rows(50, self.member), format="json")
+
+    def test_invalid_rows_create_nothing(self):
+        rows = self.rows(3, self.member)
+        rows[1]["assigned_to"] = self.manager.pk
+        rows[2]["assigned_to"] = 999999
+        response = self.client_for(self.manager).post(reverse("task-bulk-create"), rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertIn("assigned_to", response.data["errors"][0]["errors"])
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_assignee_must_be_a_whole_pk(self):
+        rows = self.rows(4, self.member)
+        rows[0]["assigned_to"] = str(self.member.pk)
+        rows[1]["assigned_to"] = self.member.pk + 0.9
+        rows[2]["assigned_to"] = f"{self.member.pk}.9"
+        rows[3]["assigned_to"] = True
+        client = self.client_for(self.manager)
+        response = client.post(reverse("task-bulk-create"), rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2, 3])
+        for error in response.data["errors"]:
+            self.assertEqual(error["errors"]["assigned_to"][0].code, "incorrect_type")
+
+        response = client.post(reverse("task-list-create"), rows[1], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["assigned_to"][0].code, "incorrect_type")
+        self.assertFalse(Task.objects.exists())
+
+    def test_members_cannot_bulk_create(self):
+        response = self.client_for(self.member).post(
+            reverse("task-bulk-create"), self.rows(1, self.member), format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class TaskTransitionTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.task = self.make_tasks(1)[0]
+        self.client = self.client_for(self.member)
+
+    def test_start_then_complete(self):
+        response = self.client.post(reverse("start-task", args=[self.task.pk]))
+        self.assertEqual((response.status_code, response.data["status"]), (200, "in_progress"))
+        response = self.client.post(reverse("complete-task", args=[self.task.pk]))
+        self.assertEqual((response.status_code, response.data["status"]), (200, "completed"))
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+    def test_repeated_transition_conflicts(self):
+        self.client.post(reverse("complete-task", args=[self.task.pk]))
+        response = self.client.post(reverse("complete-task", args=[self.task.pk]))
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post(reverse("start-task", args=[self.task.pk]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["detail"], "Cannot start task with status 'completed'")
+
+    def test_status_endpoint_follows_transition_table(self):
+        url = reverse("update-task-status", args=[self.task.pk])
+        response = self.client.patch(url, {"status": "completed"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["status"], ["Cannot change status from 'pending' to 'completed'"])
+        response = self.client.patch(url, {"status": "in_progress"}, format="json")
+        self.assertEqual(response.data["status"], "in_progress")
+        response = self.client.patch(url, {"status": "bogus"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_permissions_and_missing_tasks(self):
+        other = self.client_for(self.other_member)
+        self.assertEqual(other.post(reverse("start-task", args=[self.task.pk])).status_code, 403)
+        self.assertEqual(self.client.post(reverse("start-task", args=[999999])).status_code, 404)
+        admin = self.client_for(self.admin)
+        self.assertEqual(admin.post(reverse("start-task", args=[self.task.pk])).status_code, 200)
+
+    def test_starting_past_deadline_lands_on_overdue(self):
+        Task.objects.filter(pk=self.task.pk).update(deadline=timezone.now() - timedelta(hours=1))
+        response = self.client.post(reverse("start-task", args=[self.task.pk]))
+        self.assertEqual(response.data["status"], "overdue")
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+
+class BulkStatusTests(TaskTestMixin, TestCase):
+    def test_per_id_results(self):
+        pending, other_pending, completed = self.make_tasks(2) + self.make_tasks(1, status="completed")
+        foreign = self.make_tasks(1, assigned_to=self.other_member)[0]
+        ids = [pending.pk, other_pending.pk, completed.pk, foreign.pk, 999999, pending.pk]
+
+        response = self.client_for(self.member).post(
+            reverse("task-bulk-status"), {"ids": ids, "status": "in_progress"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            [row["result"] for row in response.data["results"]],
+            ["updated", "updated", "conflict", "forbidden", "not_found"],
+        )
+        self.assertEqual(
+            set(Task.objects.filter(status="in_progress").values_list("pk", flat=True)),
+            {pending.pk, other_pending.pk},
+        )
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+    def test_admin_can_move_any_task(self):
+        tasks = self.make_tasks(3, status="in_progress")
+        response = self.client_for(self.admin).post(
+            reverse("task-bulk-status"),
+            {"ids": [task.pk for task in tasks], "status": "completed"},
+            format="json",
+        )
+        self.assertEqual(response.data["updated"], 3)
+        self.assertEqual(TaskCounter.objects.statistics("all")["completed_tasks"], 3)
+
+    def test_rejects_bad_payloads(self):
+        client = self.client_for(self.member)
+        url = reverse("task-bulk-status")
+        self.assertEqual(client.post(url, {"ids": [1], "status": "bogus"}, format="json").status_code, 400)
+        self.assertEqual(client.post(url, {"ids": [], "status": "completed"}, format="json").status_code, 400)
+        self.assertEqual(client.post(url, {"ids": ["1"], "status": "completed"}, format="json").status_code, 400)
+
+
+class OverdueSweepTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        past = timezone.now() - timedelta(hours=1)
+        self.make_tasks(5, deadline=past)
+        self.make_tasks(2, deadline=past, status="in_progress")
+        self.make_tasks(2, deadline=past, status="completed")
+        self.make_tasks(3)
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command("update_overdue_tasks", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        output = self.sweep("--dry-run", "--chunk-size", "2")
+        self.assertIn("Would update 7 tasks", output)
+        self.assertEqual(output.count("assigned to member"), 7)
+        self.assertFalse(Task.objects.filter(status="overdue").exists())
+
+    def test_sweeps_in_chunks_and_reports_what_changed(self):
+        output = self.sweep("--chunk-size", "3")
+        self.assertIn("Successfully updated 7 tasks", output)
+        self.assertIn("was in_progress", output)
+        self.assertEqual(Task.objects.filter(status="overdue").count(), 7)
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+    def test_row_budget(self):
+        output = self.sweep("--max-rows", "4", "--chunk-size", "3")
+        self.assertIn("Successfully updated 4 tasks", output)
+        self.assertIn("more overdue tasks remain", output)
+        output = self.sweep("--max-rows", "4")
+        self.assertIn("Successfully updated 3 tasks", output)
+        self.assertNotIn("more overdue tasks remain", output)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SchedulerTests(TaskTestMixin, TestCase):
+    def test_runs_jobs_when_due_and_records_stats(self):
+        clock = FakeClock()
+        calls = []
+        job = Job("ping", lambda: calls.append(clock.now), interval=30)
+        broken = Job("broken", lambda: 1 / 0, interval=60)
+        scheduler = Scheduler([job, broken], clock=clock)
+
+        with self.assertLogs("backend.task.scheduler", "ERROR"):
+            self.assertEqual(scheduler.run_pending(), 30)
+        clock.now = 10
+        self.assertEqual(scheduler.run_pending(), 20)
+        clock.now = 30
+        scheduler.run_pending()
+
+        self.assertEqual(calls, [0.0, 30])
+        self.assertEqual(job.stats["runs"], 2)
+        self.assertEqual(broken.stats["runs"], 1)
+        self.assertEqual(broken.stats["failures"], 1)
+        self.assertIn("ZeroDivisionError", broken.stats["last_error"])
+
+    def test_job_never_overlaps_itself(self):
+        calls = []
+        job = Job("ping", lambda: calls.append(1), interval=30)
+        job.lock.acquire()
+        Scheduler([job]).run_job(job)
+        self.assertEqual(calls, [])
+        self.assertEqual(job.stats["skipped"], 1)
+
+    def test_overdue_sweep_wakes_at_next_deadline(self):
+        deadline = timezone.now() + timedelta(seconds=90)
+        self.make_tasks(1, deadline=deadline)
+        self.make_tasks(1, deadline=timezone.now() + timedelta(seconds=30), status="completed")
+        self.assertEqual(next_open_deadline(), deadline)
+
+        job = Job("sweep", lambda: None, interval=300, wake_at=next_open_deadline)
+        job.schedule(0)
+        self.assertAlmostEqual(job.next_run, 90, delta=2)
+
+
+@override_settings(TASK_COMPUTED_OVERDUE=True)
+class ComputedOverdueTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        past = timezone.now() - timedelta(hours=1)
+        self.late = self.make_tasks(2, deadline=past)
+        self.late_started = self.make_tasks(1, deadline=past, status="in_progress")
+        self.make_tasks(1, deadline=past, status="completed")
+        self.make_tasks(3)
+
+    def test_rows_keep_their_stored_status(self):
+        task = Task.objects.get(pk=self.late[0].pk)
+        task.save()
+        self.assertEqual(Task.objects.get(pk=task.pk).status, "pending")
+        self.assertEqual(task.effective_status, "overdue")
+        self.assertEqual(sweep_overdue(), ([], False))
+        self.assertFalse(Task.objects.filter(status="overdue").exists())
+
+    def test_lists_filters_and_statistics_use_effective_status(self):
+        client = self.client_for(self.member)
+        tasks = client.get(reverse("my-tasks")).json()["results"]
+        self.assertEqual(sum(task["status"] == "overdue" for task in tasks), 3)
+        self.assertTrue(all(
+            task["status_display"] == "Overdue" and task["is_overdue"]
+            for task in tasks if task["status"] == "overdue"
+        ))
+
+        response = client.get(reverse("my-tasks"), {"status": "pending"})
+        self.assertEqual(len(response.json()["results"]), 3)
+        response = client.get(reverse("my-tasks"), {"status": "overdue"})
+        self.assertEqual(len(response.json()["results"]), 3)
+        self.assertEqual(client.get(reverse("my-tasks"), {"status": "bogus"}).status_code, 400)
+
+        stats = client.get(reverse("task-statistics")).json()
+        self.assertEqual(
+            (stats["total_tasks"], stats["pending_tasks"], stats["in_progress_tasks"], stats["overdue_tasks"]),
+            (7, 3, 0, 3),
+        )
+        self.assertEqual(Task.objects.status_counts()["overdue_tasks"], 3)
+
+    def test_transitions_match_on_effective_status(self):
+        client = self.client_for(self.member)
+        response = client.post(reverse("start-task", args=[self.late[0].pk]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["detail"], "Cannot start task with status 'overdue'")
+
+        response = client.post(reverse("complete-task", args=[self.late_started[0].pk]))
+        self.assertEqual(response.data["status"], "completed")
+        self.assertEqual(TaskCounter.objects.mismatches(), [])
+
+
+class AsyncReadTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.tasks = self.make_tasks(3)
+        self.client = AsyncClient()
+
+    def headers(self, user):
+        return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def test_reads_with_bearer_tokens(self):
+        headers = self.headers(self.member)
+        response = await self.client.get(reverse("my-tasks"), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+        response = await self.client.get(reverse("task-detail", args=[self.tasks[0].pk]), headers=headers)
+        self.assertEqual(response.json()["assigned_to_username"], "member")
+        response = await self.client.get(
+            reverse("task-detail", args=[self.tasks[0].pk]), headers=self.headers(self.other_member)
+        )
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.client.get(reverse("task-statistics"), headers=self.headers(self.manager))
+        self.assertEqual(response.json()["pending_tasks"], 3)
+        response = await self.client.get(
+            reverse("manager-team-members"), {"limit": 1}, headers=self.headers(self.manager)
+        )
+        self.assertEqual((response.json()["count"], response.json()["results"][0]["id"]), (1, self.member.pk))
+
+    async def test_team_member_errors_are_logged(self):
+        with (
+            mock.patch("backend.task.async_views.team_member_data", side_effect=KeyError("email")),
+            self.assertLogs("backend.task.async_views", "ERROR") as logs,
+        ):
+            response = await self.client.get(
+                reverse("manager-team-members"), headers=self.headers(self.manager)
+            )
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {"detail": "An error occurred while fetching team members."})
+        self.assertIn("KeyError", logs.output[0])
+
+    async def test_authentication_errors(self):
+        response = await self.client.get(reverse("my-tasks"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+        response = await self.client.get(reverse("my-tasks"), headers={"Authorization": "Bearer junk"})
+        self.assertEqual(response.status_code, 401)
+        response = await self.client.get(reverse("my-tasks"), headers=self.headers(self.manager))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_concurrent_requests(self):
+        headers = self.headers(self.member)
+        responses = await asyncio.gather(
+            *[self.client.get(reverse("task-list-create"), headers=headers) for _ in range(100)]
+        )
+        self.assertEqual({response.status_code for response in responses}, {200})
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        registry.reset()
+        self.make_tasks(3)
+
+    def scrape(self):
+        response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_records_per_view_metrics(self):
+        self.client_for(self.member).get(reverse("task-list-create"))
+        self.client_for(self.member).get(reverse("task-list-create"))
+        self.client.get("/no-such-page/")
+        text = self.scrape()
+
+        self.assertIn('http_requests_total{view="task-list-create",method="GET",status="200"} 2', text)
+        self.assertIn('http_requests_total{view="unresolved",method="GET",status="404"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{view="task-list-create",method="GET"} 2', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="task-list-create",method="GET",le="+Inf"} 2', text)
+        # Listing tasks takes queries; none of them reached +Inf on their own
+        self.assertNotIn('http_request_db_queries_bucket{view="task-list-create",le="0"} 2', text)
+        self.assertIn('http_request_db_queries_count{view="task-list-create"} 2', text)
+        self.assertIn('http_response_size_bytes_count{view="task-list-create"} 2', text)
+
+    async def test_counts_queries_of_async_views(self):
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.member)}"}
+        await AsyncClient().get(reverse("my-tasks"), headers=headers)
+        text = await AsyncClient().get(
+            reverse("metrics"), headers={"Authorization": "Bearer secret"}
+        )
+        self.assertNotIn(
+            'http_request_db_queries_bucket{view="my-tasks",le="0"} 1', text.content.decode()
+        )
+        self.assertIn('http_request_db_queries_count{view="my-tasks"} 1', text.content.decode())
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_only_counted(self):
+        self.client_for(self.member).get(reverse("task-list-create"))
+        text = self.scrape()
+        self.assertIn('http_requests_total{view="task-list-create",method="GET",status="200"} 1', text)
+        self.assertNotIn("http_request_duration_seconds_count", text)
+
+    def test_aggregates_worker_snapshots(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            other = {
+                "counters": [["http_requests_total", ["task-list-create", "GET", "200"], 5]],
+                "histograms": [
+                    ["http_response_size_bytes", ["task-list-create"], [0, 1, 0, 0, 0, 0, 0, 500]]
+                ],
+            }
+            for name in ["live", "exited"]:
+                with open(f"{directory}/{name}.json", "w") as f:
+                    json.dump(other, f)
+            expired = time.time() - settings.METRICS_SNAPSHOT_TTL - 1
+            os.utime(f"{directory}/exited.json", (expired, expired))
+
+            self.client_for(self.member).get(reverse("task-list-create"))
+            text = self.scrape()
+            files = sorted(os.listdir(directory))
+
+        self.assertIn('http_requests_total{view="task-list-create",method="GET",status="200"} 6', text)
+        self.assertIn('http_response_size_bytes_count{view="task-list-create"} 2', text)
+        # This worker's snapshot is named by a per-process UUID, not its pid
+        self.assertEqual(len(files), 2)
+        self.assertIn("live.json", files)
+        self.assertNotIn(f"{os.getpid()}.json", files)
+
+    @mock.patch.object(registry, "flusher_pid", None)
+    @override_settings(METRICS_FLUSH_INTERVAL=0.01)
+    def test_snapshots_are_written_off_the_request_path(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with mock.patch.object(registry, "flush") as flush:
+                self.client_for(self.member).get(reverse("task-list-create"))
+            flush.assert_not_called()
+
+            path = registry.snapshot_path()
+            deadline = perf_counter() + 5
+            while not path.exists() and perf_counter() < deadline:
+                time.sleep(0.01)
+            self.assertIn("task-list-create", path.read_text())
+
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+        response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer secrets"})
+        self.assertEqual(response.status_code, 401)
+        self.scrape()
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+
+class ConditionalGetTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.tasks = self.make_tasks(3)
+        self.client = self.client_for(self.member)
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag(self):
+        for name in ["my-tasks", "task-list-create", "task-statistics"]:
+            first = self.client.get(reverse(name))
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first["Cache-Control"], "private, no-cache")
+            self.assertNotModified(reverse(name), if_none_match=first["ETag"])
+
+        # Filters and cursors are part of the version
+        filtered = self.client.get(reverse("my-tasks"), {"status": "pending"})
+        self.assertNotEqual(filtered["ETag"], first["ETag"])
+
+    def test_writes_change_the_version(self):
+        url = reverse("my-tasks")
+        etag = self.client.get(url)["ETag"]
+        self.tasks[0].title = "Renamed"
+        self.tasks[0].save()
+        response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        Task.objects.filter(pk=self.tasks[1].pk).update(status="in_progress")
+        response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        Task.objects.filter(pk=self.tasks[2].pk).update(assigned_to=self.other_member)
+        response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        self.tasks[0].delete()
+        response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_renaming_embedded_users_changes_the_version(self):
+        url = reverse("my-tasks")
+        for user in [self.member, self.manager]:
+            etag = self.client.get(url)["ETag"]
+            user.first_name = "Renamed"
+            user.save()
+            response = self.client.get(url, headers={"if_none_match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("Renamed", response.content.decode())
+
+        # Saves that leave the embedded fields alone keep the version
+        etag = self.client.get(url)["ETag"]
+        self.member.last_login = timezone.now()
+        self.member.save(update_fields=["last_login"])
+        self.manager.email = "boss@example.com"
+        self.manager.save()
+        self.assertNotModified(url, if_none_match=etag)
+
+    def test_versions_are_per_user(self):
+        etag = self.client.get(reverse("task-statistics"))["ETag"]
+        response = self.client_for(self.other_member).get(
+            reverse("task-statistics"), headers={"if_none_match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_only_the_etag_validates(self):
+        url = reverse("task-statistics")
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+
+        # A delete leaves the latest updated_at alone
+        self.tasks[0].delete()
+        response = self.client.get(
+            url, headers={"if_modified_since": http_date(timezone.now().timestamp() + 60)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_tasks"], 2)
+
+
+class ChangeFeedTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.tasks = self.make_tasks(3)
+
+    def changes(self, user, since=None, status_code=200):
+        params = {} if since is None else {"since": since}
+        response = self.client_for(user).get(reverse("task-changes"), params)
+        self.assertEqual(response.status_code, status_code)
+        return response.json()
+
+    def test_full_sync_then_deltas(self):
+        feed = self.changes(self.member)
+        self.assertEqual(len(feed["changed"]), 3)
+        self.assertEqual((feed["removed"], feed["more"]), ([], False))
+        cursor = feed["cursor"]
+        self.assertEqual(self.changes(self.member, cursor)["changed"], [])
+
+        self.tasks[0].title = "Renamed"
+        self.tasks[0].save()
+        Task.objects.filter(pk=self.tasks[1].pk).update(status="in_progress")
+        self.make_tasks(1, assigned_to=self.other_member)
+        feed = self.changes(self.member, cursor)
+        self.assertEqual(
+            [(row["id"], row["title"], row["status"]) for row in feed["changed"]],
+            [(self.tasks[0].pk, "Renamed", "pending"), (self.tasks[1].pk, "Task 1", "in_progress")],
+        )
+        self.assertGreater(feed["cursor"], cursor)
+
+    def test_reassignment_and_deletes_leave_tombstones(self):
+        cursors = {user: self.changes(user)["cursor"] for user in [self.member, self.other_member, self.admin]}
+        Task.objects.filter(pk=self.tasks[0].pk).update(assigned_to=self.other_member)
+        response = self.client_for(self.manager).delete(reverse("task-detail", args=[self.tasks[1].pk]))
+        self.assertEqual(response.status_code, 204)
+
+        feed = self.changes(self.member, cursors[self.member])
+        self.assertEqual((feed["changed"], feed["removed"]), ([], sorted([self.tasks[0].pk, self.tasks[1].pk])))
+        feed = self.changes(self.other_member, cursors[self.other_member])
+        self.assertEqual([row["id"] for row in feed["changed"]], [self.tasks[0].pk])
+        # Reassignment is not a removal for someone who still sees the task
+        feed = self.changes(self.admin, cursors[self.admin])
+        self.assertEqual(feed["removed"], [self.tasks[1].pk])
+
+    def test_user_deletion(self):
+        cursor = self.changes(self.admin)["cursor"]
+        self.client_for(self.admin).delete(reverse("manage_user", args=[self.member.pk]))
+        feed = self.changes(self.admin, cursor)
+        self.assertEqual(feed["removed"], sorted(task.pk for task in self.tasks))
+
+        self.make_tasks(2, assigned_to=self.other_member)
+        cursor = self.changes(self.admin)["cursor"]
+        self.manager.delete()
+        feed = self.changes(self.admin, cursor)
+        self.assertEqual([row["created_by"] for row in feed["changed"]], [None, None])
+
+    @override_settings(TASK_CHANGES_PAGE_SIZE=2)
+    def test_pages_end_on_whole_writes(self):
+        cursor = self.changes(self.member)["cursor"]
+        self.make_tasks(3)  # One write, one sequence number
+        self.tasks[0].save()
+        feed = self.changes(self.member, cursor)
+        self.assertEqual((len(feed["changed"]), feed["more"]), (3, True))
+        feed = self.changes(self.member, feed["cursor"])
+        self.assertEqual(([row["id"] for row in feed["changed"]], feed["more"]), ([self.tasks[0].pk], False))
+
+    def test_expired_and_invalid_cursors(self):
+        cursor = self.changes(self.member)["cursor"]
+        self.tasks[0].delete()
+        self.assertEqual(TaskTombstone.objects.purge(timezone.now() + timedelta(seconds=1)), 1)
+        self.changes(self.member, cursor, status_code=410)
+        self.changes(self.member, "abc", status_code=400)
+        self.changes(self.member, 10**9, status_code=400)
+        response = self.client_for(self.member).post(reverse("task-changes"))
+        self.assertEqual(response.status_code, 405)
+
+
+@skipUnless(connection.vendor == "postgresql", "Transaction id sequence numbers are PostgreSQL only")
+class ChangeFeedConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.member = User.objects.create_user("member", "member@example.com", "pass", role="member")
+        manager = User.objects.create_user("manager", "manager@example.com", "pass", role="manager")
+        self.tasks = Task.objects.bulk_create(
+            Task(
+                title=f"Task {i}",
+                description="",
+                assigned_to=self.member,
+                created_by=manager,
+                deadline=timezone.now() + timedelta(days=1),
+            )
+            for i in range(2)
+        )
+
+    def in_thread(self, func):
+        def run():
+            try:
+                func()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_writes_do_not_wait_and_readers_never_skip(self):
+        cursor = async_to_sync(read_changes)(self.member)["cursor"]
+        slow_started, release = threading.Event(), threading.Event()
+
+        def slow():
+            with transaction.atomic():
+                Task.objects.filter(pk=self.tasks[0].pk).update(title="Slow")
+                slow_started.set()
+                release.wait(10)
+
+        slow_thread = self.in_thread(slow)
+        self.assertTrue(slow_started.wait(10))
+        # A later transaction commits first, without waiting on the slow one
+        fast_thread = self.in_thread(
+            lambda: Task.objects.filter(pk=self.tasks[1].pk).update(title="Fast")
+        )
+        fast_thread.join(5)
+        self.assertFalse(fast_thread.is_alive())
+
+        # The feed holds back until the earlier transaction has finished
+        feed = async_to_sync(read_changes)(self.member, cursor)
+        self.assertEqual(feed["changed"], [])
+        release.set()
+        slow_thread.join(10)
+        feed = async_to_sync(read_changes)(self.member, feed["cursor"])
+        self.assertEqual(sorted(row["title"] for row in feed["changed"]), ["Fast", "Slow"])
+
+
+@mock.patch.object(relay, "ensure_running")
+class TaskEventTests(TaskTestMixin, TestCase):
+    async def open_stream(self, user):
+        response = await AsyncClient().get(
+            reverse("task-events"), headers={"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertIn("event: ready", await self.read(chunks))
+        return chunks
+
+    def tearDown(self):
+        hub.subscribers.clear()
+        hub.claimed.clear()
+        hub.relayed.clear()
+
+    async def read(self, chunks):
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    def event(self, kind, assigned_to, cursor, created_by=None, **extra):
+        return {
+            "type": kind,
+            "task": 1,
+            "status": "pending",
+            "assigned_to": assigned_to.pk,
+            "created_by": (created_by or self.manager).pk,
+            "cursor": cursor,
+            **extra,
+        }
+
+    async def test_events_are_scoped(self, ensure_running):
+        member = await self.open_stream(self.member)
+        manager = await self.open_stream(self.manager)
+        hub.publish([self.event("created", self.other_member, 1, created_by=self.admin)])
+        hub.publish(
+            [self.event("reassigned", self.other_member, 2, previous_assigned_to=self.member.pk)]
+        )
+
+        chunk = await self.read(member)
+        self.assertTrue(chunk.startswith("id: 2\nevent: reassigned\n"))
+        self.assertEqual(json.loads(chunk.split("data: ")[1])["previous_assigned_to"], self.member.pk)
+        self.assertIn("id: 2", await self.read(manager))
+
+    def test_refused_under_wsgi(self, ensure_running):
+        response = self.client_for(self.member).get(reverse("task-events"))
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+        self.assertIn("tasks/changes/", response.json()["detail"])
+        self.assertFalse(hub.active)
+        ensure_running.assert_not_called()
+
+    @override_settings(SSE_QUEUE_SIZE=2)
+    async def test_slow_clients_are_told_to_resync(self, ensure_running):
+        chunks = await self.open_stream(self.member)
+        hub.publish([self.event("status", self.member, cursor) for cursor in range(1, 6)])
+        await asyncio.sleep(0)
+        received = [await self.read(chunks) for _ in range(3)]
+        self.assertTrue(received[1].startswith("id: 2\n"))
+        self.assertEqual(received[2], "event: resync\ndata: {}\n\n")
+        with self.assertRaises(StopAsyncIteration):
+            await anext(chunks)
+        self.assertFalse(hub.active)
+
+    @override_settings(SSE_HEARTBEAT_SECONDS=0.01, SSE_MAX_STREAM_SECONDS=0.1)
+    async def test_heartbeats_and_max_duration(self, ensure_running):
+        chunks = await self.open_stream(self.member)
+        self.assertEqual(await self.read(chunks), ": heartbeat\n\n")
+        remaining = [chunk async for chunk in chunks]
+        self.assertEqual(set(remaining), {b": heartbeat\n\n"})
+
+    def test_writes_publish_on_commit(self, ensure_running):
+        with (
+            mock.patch.dict(hub.subscribers, {("all",): {mock.Mock()}}),
+            mock.patch.object(hub, "publish") as publish,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            task = Task.objects.create(
+                title="New", description="", assigned_to=self.member, created_by=self.manager,
+                deadline=timezone.now() + timedelta(days=1),
+            )
+            Task.objects.filter(pk=task.pk).update(status="in_progress")
+            Task.objects.filter(pk=task.pk).update(assigned_to=self.other_member)
+            task.refresh_from_db()
+            task.delete()
+
+        events = [call.args[0][0] for call in publish.call_args_list]
+        self.assertEqual(
+            [event["type"] for event in events], ["created", "status", "reassigned", "deleted"]
+        )
+        self.assertEqual(events[2]["previous_assigned_to"], self.member.pk)
+        self.assertEqual([event["cursor"] for event in events], sorted({event["cursor"] for event in events}))
+        self.assertEqual(hub.claimed, {event["cursor"] for event in events})
+
+    def test_rolled_back_writes_claim_nothing(self, ensure_running):
+        with (
+            mock.patch.dict(hub.subscribers, {("all",): {mock.Mock()}}),
+            mock.patch.object(hub, "publish") as publish,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            with transaction.atomic():
+                self.make_tasks(1)
+                transaction.set_rollback(True)
+            self.assertEqual(hub.claimed, set())
+            tasks = self.make_tasks(1)
+
+        self.assertEqual(publish.call_count, 1)
+        self.assertEqual(hub.claimed, {tasks[0].change_seq})
+
+    def test_relay_and_commit_callback_publish_once(self, ensure_running):
+        with mock.patch.dict(hub.subscribers, {("all",): {mock.Mock()}}):
+            with self.captureOnCommitCallbacks() as callbacks:
+                tasks = self.make_tasks(1)
+            seq = tasks[0].change_seq
+            with mock.patch.object(hub, "publish") as publish:
+                # The relay sees the commit before its callback runs
+                async_to_sync(relay_range)(seq - 1, seq)
+                callbacks[0]()
+                # And the other way around
+                hub.publish_committed([{"cursor": seq + 1}])
+                hub.publish_relayed([{"cursor": seq + 1}], seq, seq + 1)
+        self.assertEqual(
+            [[event["cursor"] for event in call.args[0]] for call in publish.call_args_list],
+            [[seq], [], [seq + 1], []],
+        )
+
+    async def test_relay_skips_claimed_writes(self, ensure_running):
+        tasks = await sync_to_async(self.make_tasks)(2)
+        await sync_to_async(Task.objects.filter(pk=tasks[1].pk).update)(assigned_to=self.other_member)
+        seqs = sorted({task.change_seq async for task in Task.objects.all()})
+        hub.publish_committed([self.event("updated", self.other_member, seqs[-1])])
+        with mock.patch.object(hub, "publish") as publish:
+            await relay_range(0, seqs[-1])
+        events = publish.call_args.args[0]
+        self.assertEqual([(event["type"], event["task"]) for event in events], [("updated", tasks[0].pk)])
+        self.assertEqual(hub.claimed, set())
+
+
+class TaskSearchTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.report, self.invoice, self.other = [
+            Task.objects.create(
+                title=title,
+                description=description,
+                assigned_to=assigned_to,
+                created_by=self.manager,
+                deadline=timezone.now() + timedelta(days=1),
+            )
+            for title, description, assigned_to in [
+                ("Quarterly report", "Collect the figures", self.member),
+                ("Send invoices", "Includes the quarterly reporting summary", self.member),
+                ("Quarterly report", "For someone else", self.other_member),
+            ]
+        ]
+
+    def search(self, user, q, **params):
+        return self.client_for(user).get(reverse("task-search"), {"q": q, **params})
+
+    def test_ranked_and_scoped(self):
+        response = self.search(self.member, "quarterly reports")
+        self.assertEqual(response.status_code, 200)
+        # Stemmed; title matches rank above description matches
+        self.assertEqual([row["id"] for row in response.json()["results"]], [self.report.pk, self.invoice.pk])
+        response = self.search(self.admin, "quarterly", limit=2)
+        self.assertEqual(len(response.json()["results"]), 2)
+        response = self.search(self.member, "figures", status="completed")
+        self.assertEqual(response.json()["results"], [])
+
+    def test_index_follows_writes(self):
+        self.invoice.title = "Send figures"
+        self.invoice.save()
+        Task.objects.filter(pk=self.report.pk).update(title="Archive")
+        self.other.delete()
+        self.assertEqual(
+            list(search_tasks(Task.objects.all(), "figures").values_list("pk", flat=True)),
+            [self.invoice.pk, self.report.pk],
+        )
+        self.assertFalse(search_tasks(Task.objects.all(), "quarterly report").filter(title="Quarterly report"))
+
+    def test_query_syntax_is_not_interpreted(self):
+        for q in ['"quarterly', "report OR", "NEAR(a b)", "*", "-"]:
+            self.assertEqual(self.search(self.member, q).status_code, 200)
+        self.assertEqual(self.search(self.member, "").status_code, 400)
+        self.assertEqual(self.search(self.member, "report", limit="x").status_code, 400)
+
+    def test_admin_search(self):
+        superuser = User.objects.create_superuser("root", "root@example.com", "pass")
+        self.client.force_login(superuser)
+        response = self.client.get(reverse("admin:task_task_changelist"), {"q": "figures"})
+        self.assertEqual([task.pk for task in response.context["cl"].result_list], [self.report.pk])
+        response = self.client.get(reverse("admin:task_task_changelist"), {"q": "other"})
+        self.assertEqual([task.pk for task in response.context["cl"].result_list], [self.other.pk])
+        response = self.client.get(reverse("admin:task_task_changelist"), {"q": "member other"})
+        self.assertEqual(
+            sorted(task.pk for task in response.context["cl"].result_list),
+            [self.report.pk, self.invoice.pk, self.other.pk],
+        )
 
-# Create your tests here.
@@ -0,0 +1,66 @@
+"""
+Task status state machine.
+
+Every status change goes through ``apply_transition``, which moves tasks
+with a single conditional UPDATE (``... WHERE status IN (allowed sources)``)
+instead of reading the row, checking it in Python and saving it back.
+"""
+
+from django.conf import settings
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+# Allowed next statuses for each current status
+TRANSITIONS = {
+    "pending": ["in_progress"],
+    "in_progress": ["completed"],
+    "overdue": ["completed"],
+    "completed": [],  # Cannot change from completed
+}
+
+# Shortcut actions, as (target status, statuses they may be applied from)
+ACTIONS = {
+    "start": ("in_progress", ["pending"]),
+    "complete": ("completed", ["pending", "in_progress", "overdue"]),
+}
+
+
+def can_transition(current, target):
+    return target in TRANSITIONS.get(current, [])
+
+
+def allowed_sources(target):
+    """Statuses from which ``target`` can be reached through TRANSITIONS"""
+    return [current for current, targets in TRANSITIONS.items() if target in targets]
+
+
+def transition_error(current, target):
+    return f"Cannot change status from '{current}' to '{target}'"
+
+
+def apply_transition(queryset, target, sources=None):
+    """
+    Move every task in ``queryset`` whose status is in ``sources`` (default:
+    the TRANSITIONS table) to ``target`` in one conditional UPDATE. Tasks
+    already past their deadline land on "overdue" unless being completed,
+    as Task.save() would do. Returns the number of tasks moved; zero means
+    none were in an allowed state.
+
+    With TASK_COMPUTED_OVERDUE sources are matched on the effective status
+    and the stored status is never set to overdue.
+    """
+    if sources is None:
+        sources = allowed_sources(target)
+    if not sources:
+        return 0
+
+    if settings.TASK_COMPUTED_OVERDUE:
+        return queryset.filter_status(sources).update(status=target)
+
+    new_status = Value(target)
+    if target != "completed":
+        new_status = Case(
+            When(deadline__lt=timezone.now(), then=Value("overdue")),
+            default=Value(target),
+        )
+    return queryset.filter(status__in=sources).update(status=new_status)
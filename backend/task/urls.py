@@ -1,17 +1,22 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
-    path("tasks/", views.TaskListCreateView.as_view(), name="task-list-create"),
-    path("tasks/<int:pk>/", views.TaskDetailView.as_view(), name="task-detail"),
+    path("tasks/", async_views.task_list, name="task-list-create"),
+    path("tasks/changes/", async_views.task_changes, name="task-changes"),
+    path("tasks/search/", async_views.task_search, name="task-search"),
+    path("tasks/events/", async_views.task_events, name="task-events"),
+    path("tasks/bulk/", views.bulk_create_tasks, name="task-bulk-create"),
+    path("tasks/bulk/status/", views.bulk_update_task_status, name="task-bulk-status"),
+    path("tasks/<int:pk>/", async_views.task_detail, name="task-detail"),
     path("tasks/<int:pk>/status/", views.update_task_status, name="update-task-status"),
     path("tasks/<int:pk>/start/", views.start_task, name="start-task"),
     path("tasks/<int:pk>/complete/", views.complete_task, name="complete-task"),
-    path("my-tasks/", views.get_my_tasks, name="my-tasks"),
+    path("my-tasks/", async_views.my_tasks, name="my-tasks"),
     path("available-users/", views.get_available_users, name="available-users"),
     path("all-tasks/", views.get_all_tasks, name="all-tasks"),
-    path("task-statistics/", views.get_task_statistics, name="task-statistics"),
-    path("manager/team-members/", views.get_manager_team_members, name="manager-team-members"),
+    path("task-statistics/", async_views.task_statistics, name="task-statistics"),
+    path("manager/team-members/", async_views.team_members, name="manager-team-members"),
     path(
         "update-overdue-tasks/", views.update_overdue_tasks, name="update-overdue-tasks"
     ),
@@ -1,20 +1,27 @@
-from urllib import request
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Q
-from django.core.mail import send_mail
+from django.db import transaction
 from django.conf import settings
-from .models import Task
+from .models import OutboxEmail, Task
+from .pagination import TaskCursorPagination
+from .streaming import streaming_json_response
+from .sweeper import sweep_overdue
+from .transitions import ACTIONS, allowed_sources, apply_transition, transition_error
 from .serializers import (
     TaskSerializer,
+    TaskRowSerializer,
     TaskCreateSerializer,
+    TaskBulkCreateSerializer,
     TaskUpdateSerializer,
     TaskStatusUpdateSerializer,
     UserTaskSerializer,
+    user_pk,
 )
 
 User = get_user_model()
@@ -28,100 +35,161 @@ class IsAdmin(IsAuthenticated):
         return super().has_permission(request, view) and request.user.is_admin
 
 
-class TaskListCreateView(generics.ListCreateAPIView):
+def filter_by_status(request, tasks):
+    """Apply ?status=<status>, matched against the effective status"""
+    value = request.query_params.get("status")
+    if not value:
+        return tasks
+    if value not in dict(Task.STATUS_CHOICES):
+        raise ValidationError({"status": [f"'{value}' is not a valid status."]})
+    return tasks.filter_status([value])
+
+
+class TaskCreateView(generics.CreateAPIView):
     """
-    List all tasks (admin and managers sees all, members see only their assigned tasks)
     Create new tasks (admin and managers only)
+    Listing them is async_views.task_list
     """
 
-    serializer_class = TaskSerializer
+    serializer_class = TaskCreateSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        user = self.request.user
+    def perform_create(self, serializer):
+        if self.request.user.role not in ["admin", "manager"]:
+            raise PermissionError("Only admin and manager users can create tasks.")
+        with transaction.atomic():
+            task = serializer.save(created_by=self.request.user)
+            if task.assigned_to and task.assigned_to.email:
+                queue_task_assignment_email(task, task.assigned_to)
 
-        if user.role == "admin":
-            return Task.objects.all()
-        elif user.role == "manager":
-            return Task.objects.filter(created_by=user)
-        else:
-            return Task.objects.filter(assigned_to=user)
 
+@api_view(["POST"])
+@permission_classes([IsAdminOrManager])
+def bulk_create_tasks(request):
+    """
+    Create many tasks at once (admin and manager only)
+    Expects a JSON list of task objects. Either every row is created, or
+    nothing is and the response lists the errors for each invalid row.
+    Each assignee gets one notification covering all of their new tasks.
+    """
+    rows = request.data
+    if not isinstance(rows, list) or not rows:
+        return Response(
+            {"detail": "Expected a non-empty list of tasks."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(rows) > settings.TASK_BULK_CREATE_LIMIT:
+        return Response(
+            {"detail": f"At most {settings.TASK_BULK_CREATE_LIMIT} tasks can be created at once."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    def get_serializer_class(self):
-        if self.request.method == "POST":
-            return TaskCreateSerializer
-        return TaskSerializer
+    # Load every referenced assignee in one query
+    user_ids = {user_pk(row.get("assigned_to")) for row in rows if isinstance(row, dict)}
+    user_ids.discard(None)
+    users = User.objects.in_bulk(user_ids)
 
-    def perform_create(self, serializer):
-        if self.request.user.role not in ["admin", "manager"]:
-            raise PermissionError("Only admin and manager users can create tasks.")
-        task = serializer.save(created_by=self.request.user)
-        print(f"Task created: {task.title}")
-        print(f"Assigned to: {task.assigned_to}")
-        print(f"User email: {task.assigned_to.email if task.assigned_to else 'None'}")
-        if task.assigned_to and task.assigned_to.email:
-            send_task_assignment_email_html(task, task.assigned_to)
+    tasks, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = TaskBulkCreateSerializer(data=row, context={"users": users})
+        if serializer.is_valid():
+            tasks.append(Task(**serializer.validated_data, created_by=request.user))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    if errors:
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    tasks_by_assignee = {}
+    for task in tasks:
+        tasks_by_assignee.setdefault(task.assigned_to, []).append(task)
+
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create(tasks)
+        for assigned_user, assigned_tasks in tasks_by_assignee.items():
+            if not assigned_user.email:
+                continue
+            if len(assigned_tasks) == 1:
+                queue_task_assignment_email(assigned_tasks[0], assigned_user)
+            else:
+                queue_bulk_assignment_email(assigned_tasks, assigned_user)
+
+    serializer = TaskSerializer(tasks, many=True)
+    return Response(
+        {"created": len(tasks), "tasks": serializer.data},
+        status=status.HTTP_201_CREATED,
+    )
 
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskUpdateDestroyView(generics.UpdateAPIView, generics.DestroyAPIView):
     """
-    Retrieve, update or delete a task
-    Admin and managers can perform all operations
-    Members can only view tasks assigned to them
+    Update or delete a task (admin and managers only)
+    Retrieving one is async_views.task_detail
     """
 
-    serializer_class = TaskSerializer
+    serializer_class = TaskUpdateSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
         if user.role in ["admin", "manager"]:
-            return Task.objects.all()
+            return Task.objects.with_users()
         else:
-            return Task.objects.filter(assigned_to=user)
-
-    def get_serializer_class(self):
-        if self.request.method in ["PUT", "PATCH"]:
-            return TaskUpdateSerializer
-        return TaskSerializer
+            return Task.objects.with_users().filter(assigned_to=user)
 
     def perform_update(self, serializer):
-        if request.user.role not in ["admin", "manager"]:
+        if self.request.user.role not in ["admin", "manager"]:
             raise PermissionError("Only admin and manager users can update tasks.")
         serializer.save()
 
     def perform_destroy(self, instance):
-        if request.user.role not in ["admin", "manager"]:
+        if self.request.user.role not in ["admin", "manager"]:
             raise PermissionError("Only admin and   manager users can delete tasks.")
         instance.delete()
 
 
-@api_view(["PATCH"])
-@permission_classes([IsAuthenticated])
-def update_task_status(request, pk):
+def transition_task(request, pk, target, sources, privileged, forbidden_message, conflict):
     """
-    Update task status (users can only update their own assigned tasks)
+    Apply a status transition to one task with a single conditional UPDATE.
+    Only when nothing matched is the task read again, to tell a missing
+    task (404) from someone else's (403) and from a status conflict (409).
     """
-    try:
-        task = Task.objects.get(pk=pk)
-    except Task.DoesNotExist:
-        return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
+    tasks = Task.objects.filter(pk=pk)
+    if not privileged:
+        tasks = tasks.filter(assigned_to=request.user)
 
-    if request.user.role not in ["admin", "manager"] and task.assigned_to != request.user:
-        return Response(
-            {"detail": "You can only update tasks assigned to you."},
-            status=status.HTTP_403_FORBIDDEN,
-        )
+    if apply_transition(tasks, target, sources):
+        task = Task.objects.with_users().get(pk=pk)
+        return Response(TaskSerializer(task).data, status=status.HTTP_200_OK)
 
-    serializer = TaskStatusUpdateSerializer(task, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
+    task = Task.objects.filter(pk=pk).only("status", "deadline", "assigned_to").first()
+    if task is None:
+        return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
+    if not privileged and task.assigned_to_id != request.user.id:
+        return Response({"detail": forbidden_message}, status=status.HTTP_403_FORBIDDEN)
+    return Response(conflict(task.effective_status), status=status.HTTP_409_CONFLICT)
 
-        task_serializer = TaskSerializer(task)
-        return Response(task_serializer.data, status=status.HTTP_200_OK)
 
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@api_view(["PATCH"])
+@permission_classes([IsAuthenticated])
+def update_task_status(request, pk):
+    """
+    Update task status (users can only update their own assigned tasks)
+    """
+    serializer = TaskStatusUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    target = serializer.validated_data["status"]
+    return transition_task(
+        request,
+        pk,
+        target,
+        allowed_sources(target),
+        privileged=request.user.role in ["admin", "manager"],
+        forbidden_message="You can only update tasks assigned to you.",
+        conflict=lambda current: {"status": [transition_error(current, target)]},
+    )
 
 
 @api_view(["POST"])
@@ -130,28 +198,16 @@ def start_task(request, pk):
     """
     Start a task (change status from pending to in_progress)
     """
-    try:
-        task = Task.objects.get(pk=pk)
-    except Task.DoesNotExist:
-        return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
-
-    if not request.user.is_admin and task.assigned_to != request.user:
-        return Response(
-            {"detail": "You can only start tasks assigned to you."},
-            status=status.HTTP_403_FORBIDDEN,
-        )
-
-    if task.status != "pending":
-        return Response(
-            {"detail": f"Cannot start task with status '{task.status}'"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    task.status = "in_progress"
-    task.save()
-
-    task_serializer = TaskSerializer(task)
-    return Response(task_serializer.data, status=status.HTTP_200_OK)
+    target, sources = ACTIONS["start"]
+    return transition_task(
+        request,
+        pk,
+        target,
+        sources,
+        privileged=request.user.is_admin,
+        forbidden_message="You can only start tasks assigned to you.",
+        conflict=lambda current: {"detail": f"Cannot start task with status '{current}'"},
+    )
 
 
 @api_view(["POST"])
@@ -160,27 +216,90 @@ def complete_task(request, pk):
     """
     Complete a task (change status to completed)
     """
-    try:
-        task = Task.objects.get(pk=pk)
-    except Task.DoesNotExist:
-        return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
+    target, sources = ACTIONS["complete"]
+    return transition_task(
+        request,
+        pk,
+        target,
+        sources,
+        privileged=request.user.is_admin,
+        forbidden_message="You can only complete tasks assigned to you.",
+        conflict=lambda current: {"detail": "Task is already completed."},
+    )
+
 
-    if not request.user.is_admin and task.assigned_to != request.user:
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def bulk_update_task_status(request):
+    """
+    Move many tasks to one status at once
+    Expects {"ids": [...], "status": "..."}. Transitions follow the same
+    table as the status endpoint; non-admins can only move their own tasks.
+    Every eligible task is moved in one transaction and each id gets its
+    own result.
+    """
+    serializer = TaskStatusUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    target = serializer.validated_data["status"]
+
+    ids = request.data.get("ids")
+    if (
+        not isinstance(ids, list)
+        or not ids
+        or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)
+    ):
         return Response(
-            {"detail": "You can only complete tasks assigned to you."},
-            status=status.HTTP_403_FORBIDDEN,
+            {"ids": ["Expected a non-empty list of task ids."]},
+            status=status.HTTP_400_BAD_REQUEST,
         )
-
-    if task.status in ["completed"]:
+    if len(ids) > settings.TASK_BULK_UPDATE_LIMIT:
         return Response(
-            {"detail": "Task is already completed."}, status=status.HTTP_400_BAD_REQUEST
+            {"ids": [f"At most {settings.TASK_BULK_UPDATE_LIMIT} tasks can be updated at once."]},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    ids = list(dict.fromkeys(ids))
+    sources = allowed_sources(target)
+    privileged = request.user.is_admin
+
+    with transaction.atomic():
+        current = {
+            pk: (task_status, assigned_to)
+            for pk, task_status, assigned_to in Task.objects.filter(pk__in=ids)
+            .order_by()
+            .select_for_update()
+            .with_effective_status()
+            .values_list("pk", "effective_status", "assigned_to")
+        }
+        results, eligible = {}, []
+        for pk in ids:
+            if pk not in current:
+                results[pk] = {"id": pk, "result": "not_found"}
+            elif not privileged and current[pk][1] != request.user.id:
+                results[pk] = {"id": pk, "result": "forbidden"}
+            elif current[pk][0] not in sources:
+                results[pk] = {
+                    "id": pk,
+                    "result": "conflict",
+                    "detail": transition_error(current[pk][0], target),
+                }
+            else:
+                eligible.append(pk)
+
+        updated = 0
+        if eligible:
+            updated = apply_transition(Task.objects.filter(pk__in=eligible), target, sources)
+            for pk, task_status in (
+                Task.objects.filter(pk__in=eligible)
+                .with_effective_status()
+                .values_list("pk", "effective_status")
+            ):
+                results[pk] = {"id": pk, "result": "updated", "status": task_status}
 
-    task.status = "completed"
-    task.save()
-
-    task_serializer = TaskSerializer(task)
-    return Response(task_serializer.data, status=status.HTTP_200_OK)
+    return Response(
+        {"updated": updated, "results": [results[pk] for pk in ids]},
+        status=status.HTTP_200_OK,
+    )
 
 
 @api_view(["GET"])
@@ -194,129 +313,71 @@ def get_available_users(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_my_tasks(request):
-    """
-    Get tasks assigned to the current user
-    """
-    if request.user.role in ["admin", "manager"]:
-        return Response(
-            {"detail": "This endpoint is for regular users only."},
-            status=status.HTTP_403_FORBIDDEN,
-        )
-
-    tasks = Task.objects.filter(assigned_to=request.user)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
-
-
 @api_view(["GET"])
 @permission_classes([IsAdminOrManager])
 def get_all_tasks(request):
     """
     Get all tasks (admin and manager only)
+    Pass ?stream=true to receive every task as one JSON array, streamed in
+    chunks straight from a database cursor instead of paginated (under WSGI
+    and ASGI alike)
     """
-    tasks = Task.objects.all()
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    tasks = TaskRowSerializer.values(filter_by_status(request, Task.objects.all()))
 
+    if request.query_params.get("stream") in ["1", "true"]:
+        rows = tasks.order_by("-created_at", "-id").iterator(
+            chunk_size=settings.TASK_STREAM_CHUNK_SIZE
+        )
+        return streaming_json_response(
+            TaskRowSerializer(rows).stream(),
+            batch_size=settings.TASK_STREAM_CHUNK_SIZE,
+            asynchronous=isinstance(request._request, ASGIRequest),
+        )
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_task_statistics(request):
-    """
-    Get task statistics
-    """
-    user = request.user
-
-    if user.is_admin:
-        total_tasks = Task.objects.count()
-        pending_tasks = Task.objects.filter(status="pending").count()
-        in_progress_tasks = Task.objects.filter(status="in_progress").count()
-        completed_tasks = Task.objects.filter(status="completed").count()
-        overdue_tasks = Task.objects.filter(status="overdue").count()
-    elif user.role == "manager":
-        manager_tasks = Task.objects.filter(created_by=user)
-        total_tasks = manager_tasks.count()
-        pending_tasks = manager_tasks.filter(status="pending").count()
-        in_progress_tasks = manager_tasks.filter(status="in_progress").count()
-        completed_tasks = manager_tasks.filter(status="completed").count()
-        overdue_tasks = manager_tasks.filter(status="overdue").count()
-    else:
-        user_tasks = Task.objects.filter(assigned_to=user)
-        total_tasks = user_tasks.count()
-        pending_tasks = user_tasks.filter(status="pending").count()
-        in_progress_tasks = user_tasks.filter(status="in_progress").count()
-        completed_tasks = user_tasks.filter(status="completed").count()
-        overdue_tasks = user_tasks.filter(status="overdue").count()
+    paginator = TaskCursorPagination()
+    page = paginator.paginate_queryset(tasks, request)
+    return paginator.get_paginated_response(TaskRowSerializer(page).data)
 
-    return Response(
-        {
-            "total_tasks": total_tasks,
-            "pending_tasks": pending_tasks,
-            "in_progress_tasks": in_progress_tasks,
-            "completed_tasks": completed_tasks,
-            "overdue_tasks": overdue_tasks,
-        },
-        status=status.HTTP_200_OK,
-    )
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_manager_team_members(request):
+def team_member_rows(manager_id, ordering):
     """
-    Get all members assigned tasks by the current manager with their task statistics
-    Manager only - returns members they have assigned tasks to with stats
+    One GROUP BY over a manager's tasks, keyed by assignee, with per-status
+    counts. Returns (rows, count column names), or None if ``ordering`` is
+    not a column team members can be ordered by.
     """
-    try:
-        user = request.user
-        
-        # Only managers can access this endpoint
-        if user.role != "manager":
-            return Response(
-                {"detail": "This endpoint is for managers only."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-        
-        # Get all tasks created by this manager
-        manager_tasks = Task.objects.filter(created_by=user)
-        
-        # Get all unique members assigned to these tasks
-        members = User.objects.filter(
-            id__in=manager_tasks.values_list('assigned_to', flat=True),
-            role="member"
-        ).distinct()
-        
-        member_data = []
-        
-        for member in members:
-            # Get all tasks assigned to this member that were created by the current manager
-            member_tasks = manager_tasks.filter(assigned_to=member)
-            
-            stats = {
-                "id": member.id,
-                "username": member.username,
-                "email": member.email,
-                "first_name": member.first_name,
-                "last_name": member.last_name,
-                "total_tasks": member_tasks.count(),
-                "pending_tasks": member_tasks.filter(status="pending").count(),
-                "in_progress_tasks": member_tasks.filter(status="in_progress").count(),
-                "completed_tasks": member_tasks.filter(status="completed").count(),
-                "overdue_tasks": member_tasks.filter(status="overdue").count(),
-                "date_joined": member.date_joined,
-            }
-            member_data.append(stats)
-        
-        return Response(member_data, status=status.HTTP_200_OK)
-    
-    except Exception as e:
-        print(f"Error in get_manager_team_members: {str(e)}")
-        return Response(
-            {"detail": "An error occurred while fetching team members."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    count_columns = Task.objects.status_count_expressions()
+    field = ordering.lstrip("-")
+    if field not in [*count_columns, "username", "date_joined"]:
+        return None
+    if field in ["username", "date_joined"]:
+        ordering = ordering.replace(field, f"assigned_to__{field}")
+
+    rows = (
+        Task.objects.filter(created_by=manager_id, assigned_to__role="member")
+        .values(
+            "assigned_to",
+            "assigned_to__username",
+            "assigned_to__email",
+            "assigned_to__first_name",
+            "assigned_to__last_name",
+            "assigned_to__date_joined",
         )
+        .annotate(**count_columns)
+        .order_by(ordering, "assigned_to")
+    )
+    return rows, list(count_columns)
+
+
+def team_member_data(row, count_columns):
+    return {
+        "id": row["assigned_to"],
+        "username": row["assigned_to__username"],
+        "email": row["assigned_to__email"],
+        "first_name": row["assigned_to__first_name"],
+        "last_name": row["assigned_to__last_name"],
+        **{column: row[column] for column in count_columns},
+        "date_joined": row["assigned_to__date_joined"],
+    }
 
 
 @api_view(["POST"])
@@ -326,11 +387,8 @@ def update_overdue_tasks(request):
     Update tasks that are past their deadline to overdue status
     This can be called periodically or manually
     """
-    overdue_tasks = Task.objects.filter(
-        deadline__lt=timezone.now(), status__in=["pending", "in_progress"]
-    )
-
-    updated_count = overdue_tasks.update(status="overdue")
+    tasks, _ = sweep_overdue()
+    updated_count = len(tasks)
 
     return Response(
         {
@@ -341,52 +399,54 @@ def update_overdue_tasks(request):
     )
 
 
-def send_task_assignment_email_html(task, assigned_user):
-    """Send HTML email notification when a task is assigned to a user"""
-    try:
-        if task.created_by:
-            if task.created_by.role == "admin":
-                assigned_by = "Admin"
-            else:
-                assigned_by = task.created_by.get_full_name() or task.created_by.username
-        else:
+def queue_task_assignment_email(task, assigned_user):
+    """
+    Queue an HTML email notification for a newly assigned task. Delivery
+    happens out of band via ``manage.py send_outbox_emails``.
+    """
+    if task.created_by:
+        if task.created_by.role == "admin":
             assigned_by = "Admin"
+        else:
+            assigned_by = task.created_by.get_full_name() or task.created_by.username
+    else:
+        assigned_by = "Admin"
 
-        subject = f"New Task Assigned: {task.title}"
-
-        # Create HTML email content directly in the function
-        html_message = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px;">
-                    <h2 style="color: #495057; margin: 0;">New Task Assigned</h2>
-                </div>
-                
-                <p>Hello {assigned_user.username},</p>
-                
-                <p>You have been assigned a new task by {assigned_by}.</p>
-                
-                <div style="background-color: #e9ecef; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                    <h3 style="color: #495057; margin-top: 0;">Task Details:</h3>
-                    <p><strong>Title:</strong> {task.title}</p>
-                    <p><strong>Description:</strong> {task.description or 'No description provided'}</p>
-                    <p><strong>Due Date:</strong> {task.deadline.strftime('%B %d, %Y') if task.deadline else 'Not specified'}</p>
-                    <p><strong>Status:</strong> {task.status if task.status else 'Pending'}</p>
-                </div>
-                
-                <p>Please log into the system to view more details and start working on this task.</p>
-                
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666;">
-                    <p>This is an automated message. Please do not reply to this email.</p>
-                </div>
+    subject = f"New Task Assigned: {task.title}"
+
+    # Create HTML email content directly in the function
+    html_message = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px;">
+                <h2 style="color: #495057; margin: 0;">New Task Assigned</h2>
+            </div>
+            
+            <p>Hello {assigned_user.username},</p>
+            
+            <p>You have been assigned a new task by {assigned_by}.</p>
+            
+            <div style="background-color: #e9ecef; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                <h3 style="color: #495057; margin-top: 0;">Task Details:</h3>
+                <p><strong>Title:</strong> {task.title}</p>
+                <p><strong>Description:</strong> {task.description or 'No description provided'}</p>
+                <p><strong>Due Date:</strong> {task.deadline.strftime('%B %d, %Y') if task.deadline else 'Not specified'}</p>
+                <p><strong>Status:</strong> {task.status if task.status else 'Pending'}</p>
             </div>
-        </body>
-        </html>
-        """
+            
+            <p>Please log into the system to view more details and start working on this task.</p>
+            
+            <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666;">
+                <p>This is an automated message. Please do not reply to this email.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
 
-        # Create plain text version
-        plain_message = f"""
+    # Create plain text version
+    plain_message = f"""
 Hello {assigned_user.username},
 
 You have been assigned a new task by {assigned_by}.
@@ -400,18 +460,79 @@ Task Details:
 Please log into the system to view more details and start working on this task.
 
 This is an automated message. Please do not reply to this email.
-        """
-
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[assigned_user.email],
-            html_message=html_message,
-            fail_silently=True,
-        )
+    """
+
+    OutboxEmail.objects.enqueue(
+        subject=subject,
+        message=plain_message,
+        recipient=assigned_user.email,
+        html_message=html_message,
+    )
 
-        return True
 
-    except Exception as e:
-        return False
\ No newline at end of file
+def queue_bulk_assignment_email(tasks, assigned_user):
+    """Queue one email notification listing several tasks assigned at once"""
+    created_by = tasks[0].created_by
+    if created_by and created_by.role != "admin":
+        assigned_by = created_by.get_full_name() or created_by.username
+    else:
+        assigned_by = "Admin"
+
+    subject = f"{len(tasks)} New Tasks Assigned"
+
+    task_items = "".join(
+        f"""
+                    <li style="margin-bottom: 10px;">
+                        <strong>{task.title}</strong> (due {task.deadline.strftime('%B %d, %Y')})<br>
+                        {task.description or 'No description provided'}
+                    </li>"""
+        for task in tasks
+    )
+    html_message = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px;">
+                <h2 style="color: #495057; margin: 0;">New Tasks Assigned</h2>
+            </div>
+
+            <p>Hello {assigned_user.username},</p>
+
+            <p>You have been assigned {len(tasks)} new tasks by {assigned_by}.</p>
+
+            <div style="background-color: #e9ecef; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                <ul style="padding-left: 20px; margin: 0;">{task_items}
+                </ul>
+            </div>
+
+            <p>Please log into the system to view more details and start working on these tasks.</p>
+
+            <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666;">
+                <p>This is an automated message. Please do not reply to this email.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+    task_lines = "\n".join(
+        f"- {task.title} (due {task.deadline.strftime('%B %d, %Y')})" for task in tasks
+    )
+    plain_message = f"""
+Hello {assigned_user.username},
+
+You have been assigned {len(tasks)} new tasks by {assigned_by}.
+
+{task_lines}
+
+Please log into the system to view more details and start working on these tasks.
+
+This is an automated message. Please do not reply to this email.
+    """
+
+    OutboxEmail.objects.enqueue(
+        subject=subject,
+        message=plain_message,
+        recipient=assigned_user.email,
+        html_message=html_message,
+    )
@@ -0,0 +1,13 @@
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that leaves out tests tagged "benchmark" unless they are
+    asked for with --tag=benchmark.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if not tags or "benchmark" not in tags:
+            exclude_tags = {*(exclude_tags or ()), "benchmark"}
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
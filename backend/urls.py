@@ -3,11 +3,13 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from backend.metrics import metrics_view
 from backend.user.views import health_check
 
 
 urlpatterns = [
     path("health/", health_check, name="health"),  # Add this
+    path("metrics", metrics_view, name="metrics"),
     path("admin/", admin.site.urls),
     path("api/v1/", include("backend.task.urls")),
     path("api/v1/", include("backend.user.urls")),
@@ -1,10 +1,199 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from rest_framework_simplejwt.tokens import UntypedToken
-from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import claims_are_current
+
+
+class UserCache:
+    """
+    Bounded LRU cache of users by id, with a time-to-live per entry.
+
+    One instance lives in each process. User save/delete signals evict
+    entries in this process; the TTL bounds how long another worker (or a
+    queryset ``update()``, which sends no signal) can serve a stale user.
+    Size and TTL are read from AUTH_USER_CACHE_SIZE / AUTH_USER_CACHE_TTL
+    on every call, so a size of 0 disables the cache.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        """A private copy of the cached user, or None on a miss"""
+        key = str(user_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            user = entry[1]
+        # Views may set attributes on request.user; keep the cached one clean
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        max_size = settings.AUTH_USER_CACHE_SIZE
+        if max_size <= 0:
+            return
+        key = str(user_id)
+        with self.lock:
+            self.entries[key] = (self.clock() + settings.AUTH_USER_CACHE_TTL, copy.copy(user))
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+            }
+
+
+user_cache = UserCache()
+
+
+class TokenClaimsUser(SimpleLazyObject):
+    """
+    The authenticated user as described by the access token's claims.
+
+    ``id``, ``role`` and ``is_admin`` come from the token, so permission
+    classes decide without a query. Anything else loads the real user on
+    first use, with the usual active and revoke checks.
+    """
+
+    def __init__(self, token, load_user):
+        super().__init__(load_user)
+        self.__dict__["_token"] = token
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        return True
+
+    @property
+    def id(self):
+        return self._token[api_settings.USER_ID_CLAIM]
+
+    pk = id
+
+    @property
+    def role(self):
+        return self._token["role"]
+
+    @property
+    def is_admin(self):
+        return self._token["is_admin"]
 
 
-class CookieJWTAuthentication(JWTAuthentication):
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that looks users up in the per-process user_cache,
+    so a request from a recently seen user runs no query on the user table.
+
+    With AUTH_TOKEN_USER_MODE, tokens whose role claims are current give a
+    TokenClaimsUser instead, and the user is only loaded if a view needs it.
+    """
+
+    def get_user(self, validated_token):
+        if settings.AUTH_TOKEN_USER_MODE and claims_are_current(validated_token):
+            return TokenClaimsUser(validated_token, lambda: self.load_user(validated_token))
+        return self.load_user(validated_token)
+
+    def load_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        # Only active users are cached, but the revoke claim is per token
+        self.check_user(user, validated_token)
+        return user
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views: no thread is held while the user loads"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if settings.AUTH_TOKEN_USER_MODE and claims_are_current(validated_token):
+            return TokenClaimsUser(validated_token, lambda: self.load_user(validated_token))
+
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        self.check_user(user, validated_token)
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+
+class CookieJWTAuthentication(CachedJWTAuthentication):
     """
     Custom JWT authentication that reads tokens from HTTP-only cookies
     instead of the Authorization header.
@@ -23,27 +212,10 @@ class CookieJWTAuthentication(JWTAuthentication):
 
         return (user, validated_token)
 
-    def get_validated_token(self, raw_token):
-        """
-        Validates an encoded JSON Web Token and returns a validated token
-        wrapper object.
-        """
-        messages = []
-        for AuthToken in self.get_jti_claim_types():
-            try:
-                return AuthToken(raw_token)
-            except TokenError as e:
-                messages.append(
-                    {
-                        "token_class": AuthToken.__name__,
-                        "token_type": AuthToken.token_type,
-                        "message": e.args[0],
-                    }
-                )
+    async def aauthenticate(self, request):
+        raw_token = request.COOKIES.get("access_token")
+        if raw_token is None:
+            return None
 
-        raise InvalidToken(
-            {
-                "detail": "Given token not valid for any token type",
-                "messages": messages,
-            }
-        )
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
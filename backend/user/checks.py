@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Cache backends whose entries other worker processes cannot see
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def token_user_mode_cache(app_configs, **kwargs):
+    """AUTH_TOKEN_USER_MODE relies on role changes reaching every worker"""
+    if not settings.AUTH_TOKEN_USER_MODE:
+        return []
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            "AUTH_TOKEN_USER_MODE requires a cache shared by every worker process.",
+            hint=(
+                "Role changes are recorded in the default cache. With a per-process "
+                "cache, other workers keep trusting the old role claims until the "
+                "access token expires. Set REDIS_URL or configure a shared CACHES backend."
+            ),
+            id="user.E001",
+        )
+    ]
@@ -0,0 +1,59 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashPoolBusy(Exception):
+    """Raised when the password hashing queue is full"""
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for password hashing and checking.
+
+    bcrypt holds a CPU for a few hundred milliseconds per call, so async
+    views hand that work to PASSWORD_HASH_WORKERS dedicated threads instead
+    of blocking the request workers, never more threads than there are
+    CPUs so that a login burst leaves CPU time for other requests. At most
+    PASSWORD_HASH_QUEUE_DEPTH calls may wait for a free thread; beyond that
+    ``run`` raises HashPoolBusy so the caller can shed load. Jobs should
+    not touch the database: pool threads are not tied to a request, so
+    nothing would close their connections.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.workers = 0
+        self.pending = 0
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.workers = max(1, min(settings.PASSWORD_HASH_WORKERS, os.cpu_count() or 1))
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash",
+                )
+            return self.executor
+
+    async def run(self, func, *args, **kwargs):
+        executor = self.get_executor()
+        with self.lock:
+            if self.pending >= self.workers + settings.PASSWORD_HASH_QUEUE_DEPTH:
+                raise HashPoolBusy()
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+
+hash_pool = PasswordHashPool()
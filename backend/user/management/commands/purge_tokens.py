@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.user.tokens import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWT tokens in bounded batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the expired tokens without deleting them",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=None,
+            help="Delete at most this many tokens in this run",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.TOKEN_PURGE_BATCH_SIZE,
+            help="Tokens deleted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        purged, has_more = purge_expired_tokens(
+            batch_size=options["batch_size"],
+            max_rows=options["max_rows"],
+            dry_run=options["dry_run"],
+        )
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {purged} expired tokens"))
+        if has_more:
+            self.stdout.write(
+                self.style.WARNING("Row budget reached; more expired tokens remain for the next run.")
+            )
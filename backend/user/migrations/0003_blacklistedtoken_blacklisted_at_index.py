@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # BlacklistFilter.refresh filters token_blacklist rows on blacklisted_at
+    # every AUTH_BLACKLIST_FILTER_REFRESH seconds. The table belongs to a
+    # third-party app, so its index is created here.
+
+    dependencies = [
+        ("user", "0002_alter_user_role"),
+        ("token_blacklist", "0012_alter_outstandingtoken_user"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX token_blacklist_blacklisted_at_idx "
+            "ON token_blacklist_blacklistedtoken (blacklisted_at)",
+            "DROP INDEX token_blacklist_blacklisted_at_idx",
+        ),
+    ]
@@ -17,6 +17,17 @@ class User(AbstractUser):
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email", "first_name", "last_name"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What access token claims were based on, to spot changes on save
+        instance._claims_state = instance.claims_state
+        return instance
+
+    @property
+    def claims_state(self):
+        return (self.__dict__.get("role"), self.__dict__.get("is_active"))
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.is_staff = True
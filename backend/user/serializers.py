@@ -63,7 +63,11 @@ class UserSignupSerializer(serializers.ModelSerializer):
             email=validated_data["email"],
             role=validated_data.get("role", "member"),
         )
-        user.set_password(validated_data["password"])
+        # Async signup hashes the password beforehand, off the request worker
+        if "password_hash" in validated_data:
+            user.password = validated_data["password_hash"]
+        else:
+            user.set_password(validated_data["password"])
         user.save()
         return user
 
@@ -79,7 +83,10 @@ class UserLoginSerializer(serializers.Serializer):
         if username and password:
             try:
                 user = User.objects.get(username=username)
-                if not user.check_password(password):
+                # Async login checks the password itself, off the request worker
+                if self.context.get("check_password", True) and not user.check_password(
+                    password
+                ):
                     raise serializers.ValidationError("Invalid username or password.")
             except User.DoesNotExist:
                 raise serializers.ValidationError("Invalid username or password.")
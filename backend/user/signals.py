@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .tokens import revoke_token_claims
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the user from this process's authentication cache"""
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def revoke_stale_claims(sender, instance, created, **kwargs):
+    """A changed role or active flag invalidates the claims in issued tokens"""
+    previous = getattr(instance, "_claims_state", None)
+    if not created and previous is not None and previous != instance.claims_state:
+        revoke_token_claims(instance)
+    instance._claims_state = instance.claims_state
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_claims(sender, instance, **kwargs):
+    revoke_token_claims(instance, blacklist=False)
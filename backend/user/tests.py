@@ -1,3 +1,372 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from statistics import median
+from time import perf_counter
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import UserCache, user_cache
+from .checks import token_user_mode_cache
+from .hashing import hash_pool
+from .tokens import blacklist_filter, tokens_for_user
+from .views import verify_password
+
+User = get_user_model()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class UserCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "member", "member@example.com", "pass", first_name="Mia", last_name="Member"
+        )
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-me"))
+        self.assertEqual(response.status_code, 200)
+        return [q["sql"] for q in queries if User._meta.db_table in q["sql"]], response
+
+    def test_cached_request_runs_no_user_query(self):
+        queries, _ = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        queries, response = self.user_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.data["user"]["username"], "member")
+        self.assertEqual(user_cache.stats(), {"hits": 1, "misses": 1, "evictions": 0, "size": 1})
+
+    def test_saving_or_deleting_the_user_invalidates_it(self):
+        self.user_queries()
+        self.user.first_name = "Renamed"
+        self.user.save()
+        queries, response = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data["user"]["first_name"], "Renamed")
+
+        self.user.delete()
+        self.assertEqual(self.client.get(reverse("user-me")).status_code, 401)
+
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = UserCache(clock=clock)
+        with override_settings(AUTH_USER_CACHE_SIZE=2, AUTH_USER_CACHE_TTL=10):
+            for user_id in (1, 2):
+                cache.set(user_id, self.user)
+            cache.get(1)
+            cache.set(3, self.user)
+            self.assertIsNone(cache.get(2))
+            self.assertIsNotNone(cache.get(1))
+
+            clock.now = 10
+            self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 2, "evictions": 1, "size": 1})
+
+
+@override_settings(AUTH_TOKEN_USER_MODE=True)
+class TokenClaimsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            "admin", "admin@example.com", "pass", first_name="Ada", last_name="Admin", role="admin"
+        )
+        cls.member = User.objects.create_user(
+            "member", "member@example.com", "pass", first_name="Mia", last_name="Member"
+        )
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        blacklist_filter.reset()
+
+    def client_with(self, access_token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        return client
+
+    def test_login_issues_role_claims(self):
+        response = APIClient().post(
+            reverse("login"), {"username": "admin", "password": "pass"}, format="json"
+        )
+        token = AccessToken(response.json()["access_token"])
+        self.assertEqual((token["role"], token["is_admin"]), ("admin", True))
+
+    def test_rejected_request_runs_no_queries(self):
+        client = self.client_with(tokens_for_user(self.member).access_token)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse("list_all_users"))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(len(queries), 0)
+
+    def test_role_change_distrusts_earlier_tokens(self):
+        refresh = tokens_for_user(self.admin)
+        client = self.client_with(refresh.access_token)
+        self.assertEqual(client.get(reverse("list_all_users")).status_code, 200)
+
+        admin = User.objects.get(pk=self.admin.pk)
+        admin.role = "member"
+        admin.save()
+
+        self.assertEqual(client.get(reverse("list_all_users")).status_code, 403)
+        response = APIClient().post(
+            reverse("token_refresh"), {"refresh_token": str(refresh)}, format="json"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_role_change_reaches_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": directory,
+                }
+            }
+        ):
+            client = self.client_with(tokens_for_user(self.admin).access_token)
+            self.assertEqual(client.get(reverse("list_all_users")).status_code, 200)
+            admin = User.objects.get(pk=self.admin.pk)
+            admin.role = "member"
+            admin.save()
+
+            # Another worker: none of this process's memory, same shared cache
+            user_cache.clear()
+            blacklist_filter.reset()
+            locmem._caches.clear()
+            self.assertEqual(client.get(reverse("list_all_users")).status_code, 403)
+
+    def test_refuses_process_local_cache(self):
+        errors = token_user_mode_cache(None)
+        self.assertEqual([error.id for error in errors], ["user.E001"])
+        with override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        ):
+            self.assertEqual(token_user_mode_cache(None), [])
+        with override_settings(AUTH_TOKEN_USER_MODE=False):
+            self.assertEqual(token_user_mode_cache(None), [])
+
+
+class TokenBlacklistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "member", "member@example.com", "pass", first_name="Mia", last_name="Member"
+        )
+
+    def setUp(self):
+        blacklist_filter.reset()
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post(
+            reverse("token_refresh"), {"refresh_token": str(token)}, format="json"
+        )
+
+    def test_refresh_skips_blacklist_query_for_unknown_tokens(self):
+        token = tokens_for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse("logout"), {"refresh_token": str(token)}, format="json")
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_tokens_blacklisted_elsewhere_are_picked_up_on_refresh(self):
+        clock = FakeClock()
+        token = tokens_for_user(self.user)
+        with (
+            mock.patch.object(blacklist_filter, "clock", clock),
+            mock.patch.object(blacklist_filter, "start_refresh") as start_refresh,
+        ):
+            self.assertEqual(self.refresh(token).status_code, 200)
+            BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token["jti"]))
+
+            # Accepted here until this worker reloads the filter
+            self.assertEqual(self.refresh(token).status_code, 200)
+            start_refresh.assert_not_called()
+            clock.now += settings.AUTH_BLACKLIST_FILTER_REFRESH
+            self.assertEqual(self.refresh(token).status_code, 200)
+            start_refresh.assert_called_once()
+
+            blacklist_filter.run_refresh()
+            self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_filter_reloads_off_the_request_path(self):
+        token = tokens_for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+
+        reloaded = threading.Event()
+        threads = []
+
+        def refresh():
+            threads.append(threading.current_thread())
+            reloaded.set()
+
+        with (
+            mock.patch.object(blacklist_filter, "next_refresh", 0.0),
+            mock.patch.object(blacklist_filter, "refresh", refresh),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            self.assertEqual(self.refresh(token).status_code, 200)
+            self.assertTrue(reloaded.wait(5))
+        self.assertEqual(len(queries), 0)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_blacklisted_at_is_indexed(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, BlacklistedToken._meta.db_table
+            )
+        self.assertIn(
+            ["blacklisted_at"],
+            [c["columns"] for c in constraints.values() if c["index"] and not c["unique"]],
+        )
+
+    def test_purge_deletes_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            expired = OutstandingToken.objects.create(
+                user=self.user, jti=f"expired-{i}", token="", expires_at=now - timedelta(days=1)
+            )
+            BlacklistedToken.objects.create(token=expired)
+        live = tokens_for_user(self.user)
+
+        out = StringIO()
+        call_command("purge_tokens", "--batch-size", "2", "--max-rows", "3", stdout=out)
+        self.assertIn("Deleted 3 expired tokens", out.getvalue())
+        self.assertIn("more expired tokens remain", out.getvalue())
+        call_command("purge_tokens", stdout=out)
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), [live["jti"]])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class AsyncAuthViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "member", "member@example.com", "pass1234", first_name="Mia", last_name="Member"
+        )
+
+    def login(self, password):
+        return self.client.post(
+            reverse("login"),
+            {"username": "member", "password": password},
+            content_type="application/json",
+        )
+
+    def test_signup_and_login(self):
+        response = self.client.post(
+            reverse("signup"),
+            {
+                "first_name": "Sam",
+                "last_name": "Signup",
+                "username": "sam",
+                "email": "sam@example.com",
+                "password": "Tr1cky-pass",
+                "confirm_password": "Tr1cky-pass",
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["user"]["username"], "sam")
+        self.assertTrue(User.objects.get(username="sam").check_password("Tr1cky-pass"))
+
+        self.assertEqual(self.login("pass1234").status_code, 200)
+        response = self.login("wrong")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"non_field_errors": ["Invalid username or password."]})
+
+    def test_full_hashing_queue_sheds_load(self):
+        with mock.patch.object(hash_pool, "pending", 10_000):
+            response = self.login("pass1234")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+    async def test_hashing_does_not_hold_up_other_requests(self):
+        hashing = threading.Event()
+
+        def slow_verify(password, encoded):
+            hashing.wait(5)
+            return verify_password(password, encoded)
+
+        client = AsyncClient()
+        with mock.patch("backend.user.views.verify_password", slow_verify):
+            login = asyncio.ensure_future(
+                client.post(
+                    reverse("login"),
+                    {"username": "member", "password": "pass1234"},
+                    content_type="application/json",
+                )
+            )
+            response = await asyncio.wait_for(
+                client.get(
+                    reverse("my-tasks"),
+                    headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+                ),
+                timeout=2,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(login.done())
+            hashing.set()
+            self.assertEqual((await login).status_code, 200)
+
+    @tag("benchmark")
+    async def test_benchmark_login_burst_against_task_lists(self):
+        token = str(AccessToken.for_user(self.user))
+        client = AsyncClient()
+
+        async def login():
+            response = await client.post(
+                reverse("login"),
+                {"username": "member", "password": "pass1234"},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        async def list_tasks():
+            start = perf_counter()
+            response = await client.get(
+                reverse("my-tasks"), headers={"Authorization": f"Bearer {token}"}
+            )
+            self.assertEqual(response.status_code, 200)
+            return perf_counter() - start
+
+        idle = [await list_tasks() for _ in range(20)]
+        burst = asyncio.ensure_future(asyncio.gather(*[login() for _ in range(20)]))
+        under_load = []
+        while not burst.done():
+            under_load.append(await list_tasks())
+        await burst
+
+        # Hashing runs off the request path and leaves CPUs for the rest
+        self.assertGreater(len(under_load), 1)
+        self.assertLess(median(under_load), max(20 * median(idle), 0.25))
@@ -0,0 +1,236 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# When a user's role or active flag last changed, keyed by user id
+CLAIMS_CHANGED_KEY = "auth:claims-changed:{}"
+
+# How far back each refresh of the blacklist filter looks, to catch rows
+# from transactions that committed after the previous refresh ran
+BLACKLIST_FILTER_OVERLAP = timedelta(seconds=60)
+
+
+class BlacklistFilter:
+    """
+    Bloom filter of blacklisted refresh token JTIs, one per process.
+
+    A JTI the filter has never seen is certainly not blacklisted, so the
+    common case needs no query; a possible match is confirmed against the
+    database. Tokens blacklisted in this process are added immediately.
+    Ones blacklisted by other workers are picked up by an incremental
+    reload every AUTH_BLACKLIST_FILTER_REFRESH seconds, run on a
+    background thread so no request waits for it; until then (that
+    interval plus the reload's own time) such a token is still accepted
+    here. The filter is rebuilt from unexpired rows once it holds more
+    than its capacity.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.bits = None
+        self.next_refresh = 0.0
+        self.loaded_at = None
+        self.refreshing = False
+
+    @staticmethod
+    def positions(jti, size, hashes):
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % size for i in range(hashes)]
+
+    def add_many(self, jtis):
+        with self.lock:
+            if self.bits is None:
+                return  # Loaded from the database on first use
+            for jti in jtis:
+                for position in self.positions(jti, self.size, self.hashes):
+                    self.bits[position >> 3] |= 1 << (position & 7)
+                self.count += 1
+
+    def add(self, jti):
+        self.add_many([jti])
+
+    def might_contain(self, jti):
+        if self.bits is None:
+            self.rebuild()
+        elif self.clock() >= self.next_refresh:
+            self.start_refresh()
+        with self.lock:
+            bits, size, hashes = self.bits, self.size, self.hashes
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(jti, size, hashes)
+        )
+
+    def load(self, since=None):
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        if since is not None:
+            rows = rows.filter(blacklisted_at__gte=since - BLACKLIST_FILTER_OVERLAP)
+        return list(rows.values_list("token__jti", flat=True))
+
+    def rebuild(self):
+        """Replace the filter with one sized for the unexpired blacklist"""
+        started = timezone.now()
+        jtis = self.load()
+        capacity = max(settings.AUTH_BLACKLIST_FILTER_CAPACITY, 2 * len(jtis))
+        error_rate = settings.AUTH_BLACKLIST_FILTER_ERROR_RATE
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(size / capacity * math.log(2)))
+        bits = bytearray((size + 7) // 8)
+        for jti in jtis:
+            for position in self.positions(jti, size, hashes):
+                bits[position >> 3] |= 1 << (position & 7)
+
+        with self.lock:
+            self.bits, self.size, self.hashes = bits, size, hashes
+            self.capacity, self.count = capacity, len(jtis)
+            self.loaded_at = started
+            self.next_refresh = self.clock() + settings.AUTH_BLACKLIST_FILTER_REFRESH
+
+    def refresh(self):
+        """Add rows blacklisted (by any process) since the last load"""
+        started = timezone.now()
+        jtis = self.load(since=self.loaded_at)
+        self.add_many(jtis)
+        with self.lock:
+            self.loaded_at = started
+            self.next_refresh = self.clock() + settings.AUTH_BLACKLIST_FILTER_REFRESH
+
+    def start_refresh(self):
+        """Run run_refresh on a background thread, unless one is running"""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.run_refresh, name="blacklist-refresh", daemon=True).start()
+
+    def run_refresh(self):
+        try:
+            if self.count > self.capacity:
+                self.rebuild()
+            else:
+                self.refresh()
+        except Exception:
+            logger.exception("Reloading the token blacklist filter failed")
+            with self.lock:
+                self.next_refresh = self.clock() + settings.AUTH_BLACKLIST_FILTER_REFRESH
+        finally:
+            with self.lock:
+                self.refreshing = False
+            # This thread is not tied to a request, so nothing else closes its connection
+            connections.close_all()
+
+    def reset(self):
+        with self.lock:
+            self.bits = None
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check goes through blacklist_filter first"""
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+def tokens_for_user(user):
+    """
+    A refresh token carrying the user's ``role`` and ``is_admin`` claims.
+    Its access token (and every access token refreshed from it) copies them.
+    """
+    refresh = FilteredRefreshToken.for_user(user)
+    refresh["role"] = user.role
+    refresh["is_admin"] = user.is_admin
+    return refresh
+
+
+def claims_are_current(token):
+    """
+    Whether the role claims in ``token`` can be trusted without loading the
+    user: it has them, and was issued after the last change to the user.
+    """
+    if "role" not in token or "is_admin" not in token:
+        return False
+    changed_at = cache.get(CLAIMS_CHANGED_KEY.format(token[api_settings.USER_ID_CLAIM]))
+    return changed_at is None or token["iat"] > changed_at
+
+
+def revoke_token_claims(user, blacklist=True):
+    """
+    Role change policy: claims issued before now stop being trusted.
+
+    Access tokens issued earlier fall back to a full user load, through a
+    marker in Django's default cache kept for one access token lifetime.
+    Every worker must see that marker, so AUTH_TOKEN_USER_MODE refuses to
+    start with a per-process cache (see checks.py). Unless ``blacklist`` is
+    False, the user's outstanding refresh tokens are blacklisted, so no new
+    access token with the old claims can be minted; the user logs in again.
+    """
+    cache.set(
+        CLAIMS_CHANGED_KEY.format(user.pk),
+        int(time.time()),
+        timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+    )
+    if blacklist:
+        outstanding = list(
+            OutstandingToken.objects.filter(
+                user=user, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True
+            )
+        )
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=token) for token in outstanding], ignore_conflicts=True
+        )
+        blacklist_filter.add_many(token.jti for token in outstanding)
+
+
+def purge_expired_tokens(batch_size=None, max_rows=None, dry_run=False):
+    """
+    Delete expired outstanding tokens, and with them their blacklist rows,
+    ``batch_size`` at a time, each batch in its own transaction. Expired
+    tokens are the oldest, so walking the primary key finds them without
+    an index on ``expires_at``. Stops after ``max_rows`` tokens if given;
+    with ``dry_run`` only counts them.
+
+    Returns ``(purged, has_more)``.
+    """
+    batch_size = batch_size or settings.TOKEN_PURGE_BATCH_SIZE
+    expired = OutstandingToken.objects.filter(expires_at__lt=timezone.now()).order_by("id")
+    if dry_run:
+        count = expired.count()
+        return (count, False) if max_rows is None else (min(count, max_rows), count > max_rows)
+
+    purged = 0
+    while max_rows is None or purged < max_rows:
+        limit = batch_size if max_rows is None else min(batch_size, max_rows - purged)
+        with transaction.atomic():
+            ids = list(expired.values_list("id", flat=True)[:limit])
+            if not ids:
+                return purged, False
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        purged += len(ids)
+        if len(ids) < limit:
+            return purged, False
+    return purged, expired.exists()
@@ -1,12 +1,15 @@
+import json
 import traceback
-from rest_framework import status, generics
+from asgiref.sync import sync_to_async
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
 from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
@@ -25,8 +28,13 @@ from .serializers import (
     PasswordResetSerializer,
 )
 from .permissions import IsAdmin, IsAdminOrManagerReadOnly, IsAdminOrReadOnly, IsOwnerOrAdmin
+from .hashing import HashPoolBusy, hash_pool
+from .tokens import FilteredRefreshToken, tokens_for_user
 
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 
 User = get_user_model()
 
@@ -35,91 +43,129 @@ def health_check(request):
     return HttpResponse("Django is working!")
 
 
-class SignupView(generics.CreateAPIView):
-    queryset = User.objects.all()
-    serializer_class = UserSignupSerializer
-    permission_classes = [AllowAny]
+def parse_json(request):
+    """The JSON request body as a dict, or an error response"""
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError as e:
+        return None, JsonResponse({"detail": f"JSON parse error - {e}"}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({"detail": "Expected a JSON object."}, status=400)
+    return data, None
 
-    def dispatch(self, request, *args, **kwargs):
-        
-        try:
-            response = super().dispatch(request, *args, **kwargs)
-            
-            return response
-        except Exception as e:
-            
-            return Response(
-                {"error": "Internal server error", "detail": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
 
-    def create(self, request, *args, **kwargs):
-        
+def hash_pool_busy():
+    response = JsonResponse(
+        {"detail": "Too many sign-ins in progress. Please try again shortly."},
+        status=429,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def verify_password(password, encoded):
+    """
+    Check a password against a stored hash without touching the database.
+    Returns (valid, new hash if the stored one should be upgraded, else None).
+    """
+    if not check_password(password, encoded):
+        return False, None
+    if identify_hasher(encoded).must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def token_response_data(user, message):
+    refresh = tokens_for_user(user)
+    return {
+        "message": message,
+        "user": UserSerializer(user).data,
+        "access_token": str(refresh.access_token),
+        "refresh_token": str(refresh),
+        "token_type": "Bearer",
+    }
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class SignupView(View):
+    """
+    Async signup: the password is hashed in hash_pool rather than on the
+    request worker, and a full hashing queue is answered with 429.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        data, error = parse_json(request)
+        if error:
+            return error
+
         try:
-            
-            serializer = self.get_serializer(data=request.data)
-
-            if serializer.is_valid():
-                
-                user = serializer.save()
-
-                # Create JWT tokens
-                refresh = RefreshToken.for_user(user)
-                access_token = refresh.access_token
-
-                # Return tokens in response body instead of cookies
-                return Response(
-                    {
-                        "message": "Signup successful",
-                        "user": UserSerializer(user).data,
-                        "access_token": str(access_token),
-                        "refresh_token": str(refresh),
-                        "token_type": "Bearer",
-                    },
-                    status=status.HTTP_201_CREATED,
-                )
-            else:
+            serializer = UserSignupSerializer(data=data)
+            if not await sync_to_async(serializer.is_valid)():
                 print(
                     "SIGN-UP VALIDATION ERRORS:",
                     serializer.errors,
                     file=sys.stderr,
                     flush=True,
                 )
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                password_hash = await hash_pool.run(
+                    make_password, serializer.validated_data["password"]
+                )
+            except HashPoolBusy:
+                return hash_pool_busy()
+            user = await sync_to_async(serializer.save)(password_hash=password_hash)
+
+            # Return tokens in response body instead of cookies
+            return JsonResponse(
+                await sync_to_async(token_response_data)(user, "Signup successful"),
+                status=status.HTTP_201_CREATED,
+            )
         except Exception as e:
-            
-            return Response(
+            return JsonResponse(
                 {"error": "Internal server error", "detail": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
 
-class LoginView(generics.GenericAPIView):
-    serializer_class = UserLoginSerializer
-    permission_classes = [AllowAny]
+@method_decorator(csrf_exempt, name="dispatch")
+class LoginView(View):
+    """
+    Async login: the user lookup and bcrypt check run in hash_pool rather
+    than on the request worker, and a full hashing queue is answered with 429.
+    """
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.validated_data["user"]
+    async def post(self, request, *args, **kwargs):
+        data, error = parse_json(request)
+        if error:
+            return error
 
-            # Create JWT tokens
-            refresh = RefreshToken.for_user(user)
-            access_token = refresh.access_token
+        serializer = UserLoginSerializer(data=data, context={"check_password": False})
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            # Return tokens in response body instead of cookies
-            return Response(
-                {
-                    "message": "Login successful",
-                    "user": UserSerializer(user).data,
-                    "access_token": str(access_token),
-                    "refresh_token": str(refresh),
-                    "token_type": "Bearer",
-                },
-                status=status.HTTP_200_OK,
+        user = serializer.validated_data["user"]
+        password = serializer.validated_data["password"]
+        try:
+            valid, rehashed = await hash_pool.run(verify_password, password, user.password)
+        except HashPoolBusy:
+            return hash_pool_busy()
+        if not valid:
+            return JsonResponse(
+                {"non_field_errors": ["Invalid username or password."]},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if rehashed:
+            # Hasher settings changed since this hash was made; store the new one
+            user.password = rehashed
+            await user.asave(update_fields=["password"])
+
+        # Return tokens in response body instead of cookies
+        return JsonResponse(
+            await sync_to_async(token_response_data)(user, "Login successful"),
+            status=status.HTTP_200_OK,
+        )
 
 
 class UserMeView(APIView):
@@ -144,7 +190,7 @@ def logout_view(request):
         refresh_token = request.data.get("refresh_token")
         if refresh_token:
             # Blacklist the refresh token
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
 
         return Response(
@@ -173,7 +219,7 @@ class TokenRefreshView(APIView):
             )
 
         try:
-            refresh = RefreshToken(refresh_token)
+            refresh = FilteredRefreshToken(refresh_token)
             new_access = refresh.access_token
 
             response_data = {"access_token": str(new_access), "token_type": "Bearer"}
@@ -197,7 +243,7 @@ def blacklist_token_view(request):
     try:
         refresh_token = request.data.get("refresh_token")
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
 
         return Response(
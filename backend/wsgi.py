@@ -2,6 +2,9 @@
 WSGI config for backend project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Deployments should serve backend/asgi.py instead (see gunicorn.conf.py):
+under WSGI the async views run behind async_to_sync, one request per
+worker thread, and the task event stream (tasks/events/) is refused.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -0,0 +1,17 @@
+"""
+gunicorn settings, read when gunicorn is started from the repository root:
+
+    gunicorn --bind 0.0.0.0:8000
+
+Serves the ASGI application (backend/asgi.py) through uvicorn workers, so
+the async views (task reads, login and signup, the task event stream) run
+on each worker's event loop rather than behind async_to_sync, and the
+password hashing pool keeps bcrypt off the request path. WEB_CONCURRENCY
+sets the number of worker processes (default: one per CPU).
+"""
+
+import os
+
+wsgi_app = "backend.asgi:application"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))